@@ -0,0 +1,59 @@
+"""
+Micro-benchmark for clustering.filter_hits on synthetic dense-hit reads,
+against the previous quadratic implementation that compared every
+candidate with every picked hit.
+
+Usage, from the repository root (or drop PYTHONPATH after pip install -e .):
+    PYTHONPATH=. python benchmarks/bench_filter_hits.py
+"""
+import random
+import time
+from softmatch.clustering import filter_hits
+
+ROUNDS = 5
+
+def filter_hits_quadratic(hits):
+    if not hits:
+        return []
+    sorted_hits = sorted(hits, key=lambda x: (x['errors'], -x['len'], x['start']))
+    picked = []
+    for h in sorted_hits:
+        overlap = False
+        for p in picked:
+            if h['start'] < p['end'] and h['end'] > p['start']:
+                overlap = True
+                break
+        if not overlap:
+            picked.append(h)
+    return sorted(picked, key=lambda x: x['start'])
+
+def dense_hits(rng, read_len, n_hits, min_len=8, max_len=16):
+    """Many short, heavily overlapping hits, as with high --errors or short queries."""
+    hits = []
+    for _ in range(n_hits):
+        length = rng.randint(min_len, max_len)
+        start = rng.randrange(read_len - length)
+        hits.append({'name': 'q', 'start': start, 'end': start + length, 'len': length,
+                     'errors': rng.randint(0, 3), 'strand': rng.choice((1, -1))})
+    return hits
+
+def _time(fn, reads):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for hits in reads:
+            fn(hits)
+    return (time.perf_counter() - start) / ROUNDS / len(reads)
+
+def main():
+    rng = random.Random(0)
+    print(f"{'read len':>9} {'hits':>6} {'quadratic':>12} {'bisect':>12} {'speedup':>8}")
+    for read_len, n_hits in ((150, 100), (1000, 500), (10000, 2000), (100000, 10000)):
+        reads = [dense_hits(rng, read_len, n_hits) for _ in range(5)]
+        for hits in reads:
+            assert filter_hits(hits) == filter_hits_quadratic(hits)
+        old = _time(filter_hits_quadratic, reads)
+        new = _time(filter_hits, reads)
+        print(f"{read_len:>9} {n_hits:>6} {old * 1000:>10.2f}ms {new * 1000:>10.2f}ms {old / new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark for the seed prefilter on growing query sets: the Aho-Corasick
+scan in prefilter.find_candidates against the previous hash scan (one
+pass per seed length), plus end-to-end matching with and without the
+prefilter.
+
+Usage, from the repository root (or drop PYTHONPATH after pip install -e .):
+    PYTHONPATH=. python benchmarks/bench_prefilter.py
+"""
+import random
+import time
+from softmatch.processing import compile_queries, find_matches
+from softmatch.prefilter import build_seed_index, find_candidates
+
+MAX_ERRORS = 2
+N_READS = 500
+READ_LEN = 150
+# Unfiltered matching is linear in the query count; only time it on a few reads
+N_READS_UNFILTERED = 50
+
+def hash_scan(index, read_seq):
+    """Previous find_candidates seed scan: one sliding pass per seed length."""
+    k = index['max_errors']
+    n = len(read_seq)
+    raw = {}
+    for seed_len, seeds in index['seeds'].items():
+        for i in range(n - seed_len + 1):
+            entries = seeds.get(read_seq[i:i + seed_len])
+            if entries is None:
+                continue
+            for query_idx, strand, offset, m in entries:
+                start = i - offset
+                raw.setdefault((query_idx, strand), []).append((max(0, start - k), min(n, start + m + k)))
+    return raw
+
+def random_seq(rng, n):
+    return ''.join(rng.choice('ACGT') for _ in range(n))
+
+def make_reads(rng, queries):
+    reads = []
+    for _ in range(N_READS):
+        read = list(random_seq(rng, READ_LEN))
+        if rng.random() < 0.3:
+            planted = rng.choice(queries)['seq']
+            pos = rng.randrange(READ_LEN - len(planted))
+            read[pos:pos + len(planted)] = planted
+        reads.append(''.join(read))
+    return reads
+
+def _time(fn, reads):
+    start = time.perf_counter()
+    for read in reads:
+        fn(read)
+    return (time.perf_counter() - start) / len(reads)
+
+def main():
+    rng = random.Random(0)
+    print(f"{'queries':>8} {'hash scan':>11} {'automaton':>11} {'prefilter+verify':>17} {'no prefilter':>13}")
+    for n_queries in (10, 100, 1000):
+        queries = [{'name': f"q{i}", 'seq': random_seq(rng, rng.randint(18, 40))} for i in range(n_queries)]
+        queries = compile_queries(queries, MAX_ERRORS)
+        index = build_seed_index(queries, MAX_ERRORS)
+        reads = make_reads(rng, queries)
+
+        old = _time(lambda read: hash_scan(index, read), reads)
+        new = _time(lambda read: find_candidates(index, read), reads)
+        filtered = _time(lambda read: find_matches(read, queries, MAX_ERRORS, windows=find_candidates(index, read)),
+                         reads)
+        unfiltered = _time(lambda read: find_matches(read, queries, MAX_ERRORS), reads[:N_READS_UNFILTERED])
+        print(f"{n_queries:>8} {old * 1e6:>9.0f}us {new * 1e6:>9.0f}us {filtered * 1e6:>15.0f}us "
+              f"{unfiltered * 1e6:>11.0f}us")
+
+if __name__ == "__main__":
+    main()
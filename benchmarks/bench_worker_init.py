@@ -0,0 +1,44 @@
+"""
+Per-batch IPC overhead: pickling compiled queries with every batch versus
+compiling them once per worker in the pool initializer.
+
+Unpickling a compiled regex pattern recompiles it, so the pickle round trip
+below is what each worker paid per batch before queries moved to
+softmatch.cli._init_worker.
+
+Usage, from the repository root (or drop PYTHONPATH after pip install -e .):
+    PYTHONPATH=. python benchmarks/bench_worker_init.py
+"""
+import pickle
+import random
+import time
+from softmatch.processing import compile_queries
+
+BATCH_SIZE = 1000
+READ_LEN = 150
+ROUNDS = 5
+
+def _random_seq(rng, n):
+    return ''.join(rng.choice('ACGT') for _ in range(n))
+
+def _round_trip(payload):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        pickle.loads(pickle.dumps(payload))
+    return (time.perf_counter() - start) / ROUNDS
+
+def main():
+    rng = random.Random(0)
+    batch = [(f"@read{i}", _random_seq(rng, READ_LEN), "I" * READ_LEN) for i in range(BATCH_SIZE)]
+    batch_only = _round_trip((batch,))
+
+    print(f"{'queries':>8} {'per-batch (old)':>16} {'per-batch (init)':>17} {'bytes (old)':>12} {'bytes (init)':>13}")
+    for n_queries in (10, 100, 1000):
+        queries = [{'name': f"q{i}", 'seq': _random_seq(rng, 25)} for i in range(n_queries)]
+        compiled = compile_queries([dict(q) for q in queries], 2)
+        old = _round_trip((batch, compiled, 2, 'regex', None))
+        print(f"{n_queries:>8} {old * 1000:>14.2f}ms {batch_only * 1000:>15.2f}ms "
+              f"{len(pickle.dumps((batch, compiled))):>12} {len(pickle.dumps((batch,))):>13}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import hashlib
+import json
+import os
+import pickle
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_SUFFIX = '.ckpt'
+
+def checkpoint_path(output):
+    """Checkpoint file of a run, e.g. softmatch_results.txt.ckpt."""
+    return str(output) + CHECKPOINT_SUFFIX
+
+def run_fingerprint(options, query_csv, inputs):
+    """
+    Hash of everything that decides a run's output: the options (a dict of
+    JSON-serialisable values), the query file's contents and the input
+    paths and sizes. A checkpoint is only resumed by a run with the same
+    fingerprint.
+    """
+    h = hashlib.sha1(f"v{CHECKPOINT_VERSION}".encode())
+    h.update(json.dumps(options, sort_keys=True).encode())
+    with open(query_csv, 'rb') as f:
+        h.update(hashlib.sha1(f.read()).digest())
+    for path in inputs:
+        h.update(f"\n{path}\t{os.path.getsize(path) if path and os.path.exists(path) else -1}".encode())
+    return h.hexdigest()
+
+def save_checkpoint(path, state):
+    """
+    Atomically replaces the checkpoint at path with state (a dict that
+    includes 'fingerprint'): written to a temporary file, synced, then
+    renamed, so a crash leaves either the old or the new checkpoint.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(dict(state, version=CHECKPOINT_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path, fingerprint):
+    """
+    Loads the checkpoint at path, or returns None if there is none.
+    Raises ValueError if it belongs to a different run. Checkpoints are
+    pickles, so only load ones you created.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if not isinstance(state, dict) or state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is not a softmatch checkpoint (version {CHECKPOINT_VERSION})")
+    if state['fingerprint'] != fingerprint:
+        raise ValueError(f"{path} was written by a run with different queries, inputs or options")
+    return state
+
+def truncate_output(path, size):
+    """Cuts an output file back to its length at the checkpoint."""
+    if os.path.getsize(path) < size:
+        raise ValueError(f"{path} is shorter than at the checkpoint; cannot resume")
+    with open(path, 'r+b') as f:
+        f.truncate(size)
@@ -1,23 +1,607 @@
 import argparse
 import sys
+import collections
 import concurrent.futures
+import contextlib
+import functools
+import glob
 import itertools
-import regex
+import os
 from pathlib import Path
-from .processing import parse_fastq, parse_queries, find_matches, reverse_complement, expand_ambiguous
+from .processing import (parse_fastq, parse_queries, find_matches, compile_queries, ENGINES,
+                         fastq_shards, parse_fastq_range, anchored_windows, intersect_windows,
+                         find_presence, find_matches_batch, anchor_spans, parse_error_types,
+                         MISMATCHES_ONLY, split_read_windows, merge_window_hits, parse_fastq_pairs,
+                         mate_names, pair_view, pair_id)
 from .visualization import generate_html, generate_cluster_html
-from .clustering import cluster_reads
+from .clustering import SignatureSummary, filter_hits
+from .demux import DemuxWriter, signature_filename, trim_span, DEFAULT_MAX_OPEN
+from .index import IndexWriter, ResultIndex, index_path, STRANDS
+from .checkpoint import checkpoint_path, run_fingerprint, save_checkpoint, load_checkpoint, truncate_output
+from .hits import HitColumns, encode_chunk, set_chunk_file, hit_table_header
+from .prefilter import build_seed_index, find_candidates
+from .whitelist import load_or_build_whitelist_index, find_whitelist_matches
+from .hamming import compile_hamming_queries, find_hamming_batch
+from . import hamming
+from .pipeline import bounded_map, BackgroundWriter
+from .compression import DEFAULT_DECOMPRESS_THREADS, detect_compression, STDIN
 
 DEFAULT_ERRORS = 2
+DEFAULT_ENGINE = 'regex'
+# Hash-index engine for large fixed-length barcode whitelists (substitutions only)
+WHITELIST_ENGINE = 'whitelist'
+# Vectorised substitution-only engine over whole batches (needs NumPy)
+HAMMING_ENGINE = 'hamming'
 BATCH_SIZE = 1000
+INFLIGHT_PER_WORKER = 2
+SHARD_BYTES = 8 * 1024 * 1024
+# --long-reads: bases per window (plus the overlap) and per batch
+LONG_READ_WINDOW = 10000
+LONG_READ_BATCH_BASES = 1000000
+WRITE_BUFFER_SIZE = 1024 * 1024
+# Batches between checkpoints when --resume is given without --checkpoint-every
+CHECKPOINT_EVERY = 100
+# Options that do not change a run's output, so a resumed run may change them
+RESUMABLE_OPTIONS = ('resume', 'checkpoint_every', 'max_inflight', 'decompress_threads', 'cache_size')
+# --output path standing for standard output
+STDOUT = '-'
+DEFAULT_CACHE_SIZE = 10000
+MODES = ('full', 'presence')
+OUTPUT_FORMATS = ('tsv', 'columnar', 'both')
+DEFAULT_MODE = 'full'
+# Presence flag per query from its two strand bits (forward, reverse)
+PRESENCE_FLAGS = ('.', '+', '-', '+-')
 
-def _process_read_batch(batch, queries, max_errors):
-    """Worker function for multiprocessing."""
-    results = []
+# Per-worker matching state, filled once by _init_worker so that batches
+# only carry read data instead of the (compiled) query set.
+_worker_state = {}
+
+# Worker settings besides queries and max_errors, with their defaults; see _worker_settings
+WORKER_DEFAULTS = {
+    'engine': DEFAULT_ENGINE,
+    'seed_index': None,
+    'cache_size': DEFAULT_CACHE_SIZE,
+    'search_5p': None,
+    'search_3p': None,
+    'mode': DEFAULT_MODE,
+    'summary_sample': 0,
+    'batch_regex': False,
+    'whitelist': None,
+    'error_types': None,
+    'demux': False,
+    'trim': False,
+    'output_format': 'tsv',
+    'index': False,
+}
+
+def _worker_settings(queries, max_errors, **options):
+    """
+    Settings dict for _init_worker: WORKER_DEFAULTS overridden by options.
+    Options are passed by name, and unknown names raise TypeError, so a
+    misspelt or misplaced setting fails loudly instead of misconfiguring
+    every worker.
+    """
+    unknown = sorted(set(options) - set(WORKER_DEFAULTS))
+    if unknown:
+        raise TypeError(f"Unknown worker settings: {', '.join(unknown)}")
+    return dict(WORKER_DEFAULTS, queries=queries, max_errors=max_errors, **options)
+
+def _init_worker(settings):
+    """
+    Pool initializer: compile the query set once per worker process.
+    settings comes from _worker_settings. The whitelist engine instead
+    uses the whitelist index it is given.
+    """
+    queries = settings['queries']
+    max_errors = settings['max_errors']
+    engine = settings['engine']
+    mode = settings['mode']
+    seed_index = settings['seed_index']
+    search_5p = settings['search_5p']
+    search_3p = settings['search_3p']
+    # The whitelist engine only takes the global windows, applied to whole barcodes
+    _worker_state['anchored'] = engine != WHITELIST_ENGINE and (
+        search_5p is not None or search_3p is not None
+        or any(q.get('search_5p') is not None or q.get('search_3p') is not None for q in queries))
+    # One screen pass per query strand over each batch; only whole-read regex
+    # scans can be batched
+    _worker_state['batch_regex'] = (settings['batch_regex'] and engine == 'regex' and mode == 'full'
+                                    and seed_index is None and not _worker_state['anchored'])
+    if engine == WHITELIST_ENGINE:
+        _worker_state['queries'] = queries
+    elif engine == HAMMING_ENGINE:
+        _worker_state['queries'] = compile_hamming_queries(queries)
+    else:
+        _worker_state['queries'] = compile_queries(queries, max_errors, engine, bestmatch=(mode == 'full'),
+                                                   error_types=settings['error_types'],
+                                                   screens=_worker_state['batch_regex'])
+    _worker_state['whitelist'] = settings['whitelist']
+    _worker_state['mode'] = mode
+    _worker_state['max_errors'] = max_errors
+    _worker_state['engine'] = engine
+    _worker_state['seed_index'] = seed_index
+    _worker_state['search_5p'] = search_5p
+    _worker_state['search_3p'] = search_3p
+    # LRU of read sequence -> (hits or presence mask, rejected by prefilter)
+    _worker_state['cache'] = collections.OrderedDict()
+    _worker_state['cache_size'] = settings['cache_size']
+    # Reads per signature sampled for the streaming --summary (0: no summary)
+    _worker_state['summary_sample'] = settings['summary_sample']
+    # --demux-dir: also return each batch's reads as FASTQ per signature (--trim: trimmed)
+    _worker_state['demux'] = settings['demux']
+    _worker_state['trim'] = settings['trim']
+    # 'tsv', 'columnar' (hit table chunks only) or 'both'
+    _worker_state['output_format'] = settings['output_format']
+    # --index: also return the byte offsets of the batch's rows per read and hit
+    _worker_state['index'] = settings['index']
+    # File column of the current task's rows, set by _process_file_batch
+    _worker_state['row_prefix'] = ''
+
+def _new_stats():
+    return {'reads': 0, 'reads_with_hits': 0, 'prefilter_rejected': 0,
+            'cache_lookups': 0, 'cache_hits': 0, 'collapsed': 0}
+
+def _read_windows(seq):
+    """
+    Candidate windows of a read from the seed prefilter and read-end
+    anchoring (None: whole read). Returns (windows, rejected).
+    """
+    windows = None
+    rejected = False
+    seed_index = _worker_state['seed_index']
+    if seed_index is not None:
+        windows = find_candidates(seed_index, seq)
+        rejected = not windows
+    if _worker_state['anchored']:
+        windows = intersect_windows(windows, anchored_windows(_worker_state['queries'], len(seq),
+                                                              _worker_state['search_5p'], _worker_state['search_3p']))
+    return windows, rejected
+
+def _match_batch(seqs):
+    """
+    Matches the distinct sequences of a batch that are not cached yet in one
+    call to a batch kernel: the Hamming engine, or find_matches_batch with
+    --batch-regex.
+    Returns {seq: (hits, rejected)} for _match_read, or None when batching
+    is off.
+    """
+    hamming_engine = _worker_state['engine'] == HAMMING_ENGINE
+    if not (hamming_engine or _worker_state['batch_regex']):
+        return None
+    cache = _worker_state['cache']
+    todo = list(dict.fromkeys(seq for seq in seqs if seq not in cache))
+    queries = _worker_state['queries']
+    max_errors = _worker_state['max_errors']
+    if not hamming_engine:
+        return {seq: (hits, False) for seq, hits in zip(todo, find_matches_batch(todo, queries, max_errors))}
+
+    presence = _worker_state['mode'] == 'presence'
+    batched = {}
+    passed = []
+    windows_list = []
+    for seq in todo:
+        windows, rejected = _read_windows(seq)
+        if rejected:
+            batched[seq] = (0 if presence else [], True)
+        else:
+            passed.append(seq)
+            windows_list.append(windows)
+    results = find_hamming_batch(passed, queries, max_errors, windows_list, presence)
+    batched.update((seq, (hits, False)) for seq, hits in zip(passed, results))
+    return batched
+
+def _match_uncached(seq):
+    """Matches one read with the worker's engine; returns (hits, rejected)."""
+    queries = _worker_state['queries']
+    max_errors = _worker_state['max_errors']
+    presence = _worker_state['mode'] == 'presence'
+    windows, rejected = _read_windows(seq)
+    if rejected:
+        return (0 if presence else []), True
+    if _worker_state['engine'] == HAMMING_ENGINE:
+        return find_hamming_batch([seq], queries, max_errors, [windows], presence)[0], False
+    if _worker_state['whitelist'] is not None:
+        spans = anchor_spans(len(seq), _worker_state['search_5p'], _worker_state['search_3p'])
+        return find_whitelist_matches(seq, _worker_state['whitelist'], spans), False
+    if presence:
+        return find_presence(seq, queries, max_errors, _worker_state['engine'], windows), False
+    return find_matches(seq, queries, max_errors, _worker_state['engine'], windows), False
+
+def _match_read(seq, stats, batched=None):
+    """
+    Matches one read sequence, memoized in the worker's bounded LRU cache
+    so exact-duplicate reads skip fuzzy matching.
+    Returns (hits, rejected) where rejected is True if the prefilter
+    ruled the read out; in presence mode hits is a find_presence bitmask.
+    batched holds hits already computed by _match_batch.
+    """
+    cache = _worker_state['cache']
+    cache_size = _worker_state['cache_size']
+    if cache_size:
+        stats['cache_lookups'] += 1
+        cached = cache.get(seq)
+        if cached is not None:
+            cache.move_to_end(seq)
+            stats['cache_hits'] += 1
+            return cached
+
+    if batched is not None and seq in batched:
+        hits, rejected = batched[seq]
+    else:
+        hits, rejected = _match_uncached(seq)
+
+    if cache_size:
+        cache[seq] = (hits, rejected)
+        if len(cache) > cache_size:
+            cache.popitem(last=False)
+    return hits, rejected
+
+def _match_records(records, stats):
+    """
+    Matches an iterable of FASTQ records with the worker's query set.
+    Yields (header, seq, hits) per read, counting reads seen and prefilter
+    rejections into stats. With --demux-dir the reads also pass through
+    _demux_records.
+    """
+    matched = _match_record_hits(records, stats)
+    if _worker_state['demux']:
+        return _demux_records(matched, stats)
+    return ((header, seq, hits) for header, seq, hits, qual in matched)
+
+def _match_record_hits(records, stats):
+    """_match_records, yielding (header, seq, hits, qual)."""
+    batched = None
+    if _worker_state['batch_regex'] or _worker_state['engine'] == HAMMING_ENGINE:
+        records = list(records)
+        batched = _match_batch(seq for _, seq, _ in records)
+    for header, seq, qual in records:
+        stats['reads'] += 1
+        hits, rejected = _match_read(seq, stats, batched)
+        stats['prefilter_rejected'] += rejected
+        yield header, seq, hits, qual
+
+def _demux_records(matched, stats):
+    """
+    Passes (header, seq, hits, qual) records on as (header, seq, hits) and
+    collects them as FASTQ text per signature (see signature_filename),
+    trimmed to trim_span with --trim. Once all records are through,
+    stats['demux'] is {file name: FASTQ bytes} for the parent's DemuxWriter.
+    """
+    trim = _worker_state['trim']
+    blocks = {}
+    for header, seq, hits, qual in matched:
+        picked = filter_hits(hits)
+        name = signature_filename(tuple((h['name'], h['strand']) for h in picked))
+        start, end = trim_span(len(seq), picked) if trim else (0, len(seq))
+        blocks.setdefault(name, []).append(f"{header}\n{seq[start:end]}\n+\n{qual[start:end]}\n")
+        yield header, seq, hits
+    stats['demux'] = {name: "".join(parts).encode() for name, parts in blocks.items()}
+
+def _finish_batch(matched, stats, keep, paired=False):
+    """
+    Formats matched reads into an encoded block of TSV rows in the worker,
+    so the parent only has to write bytes. See _format_batch.
+    """
+    return _format_batch(matched, stats, keep, [q['name'] for q in _worker_state['queries']],
+                         _worker_state['mode'] == 'presence', _worker_state['summary_sample'], paired,
+                         _worker_state['output_format'], _worker_state['row_prefix'], _worker_state['index'])
+
+def _format_batch(matched, stats, keep, query_names, presence, summary_sample, paired=False, output_format='tsv',
+                  row_prefix='', index=False):
+    """
+    Formats (header, seq, hits) of matched reads into TSV rows.
+    Returns (block, reports, stats): block is the encoded rows and reports
+    a HitColumns holding the first keep reads and their hits (for the HTML
+    buffer). In presence mode rows hold one flag column per query,
+    stats['signatures'] counts reads per presence mask and no reads are
+    kept. With summary_sample set, stats['clusters'] is this batch's
+    SignatureSummary over all of its reads.
+    With paired, seq and hits are (R1, R2) tuples: full-mode rows get a
+    mate column, presence masks and reports are pair-level (see mate_names
+    and pair_view).
+    With output_format 'columnar' or 'both', stats['columns'] is the reads
+    with hits as a hit table chunk (see encode_chunk); 'columnar' leaves
+    block empty.
+    row_prefix starts every row (the File column). With index,
+    stats['index'] is (reads, hits) for the IndexWriter: (read_id, offset,
+    n_rows) per read and (query_idx, strand, errors, offset) per hit, with
+    byte offsets of rows within block.
+    """
+    n_flags = len(query_names)
+    query_idx = {name: i for i, name in enumerate(query_names)}
+    if paired:
+        n_flags *= 2
+        query_names = mate_names(query_names)
+    summary = SignatureSummary(summary_sample) if summary_sample else None
+    lines = []
+    reports = HitColumns(query_names)
+    tsv = output_format != 'columnar'
+    table = HitColumns(query_names) if output_format != 'tsv' else None
+    if presence:
+        keep = 0
+    signatures = collections.Counter()
+    # Per read with rows: (read_id, first row, rows); per hit: (query, strand, errors, row)
+    index_reads = []
+    index_hits = []
+    for header, seq, hits in matched:
+        read_id = header.split()[0] # Take first part of header
+        if paired:
+            read_id = pair_id(header)
+            mate_hits = hits
+            if presence:
+                hits = mate_hits[0] | mate_hits[1] << n_flags
+            else:
+                seq, hits = pair_view(seq[0], seq[1], mate_hits[0], mate_hits[1])
+        if summary is not None:
+            summary.add({'id': read_id, 'seq': seq, 'hits': hits})
+        if hits:
+            stats['reads_with_hits'] += 1
+            first_row = len(lines)
+            if table is not None:
+                table.add(read_id, '', hits)
+            if presence:
+                signatures[hits] += 1
+                flags = "\t".join(PRESENCE_FLAGS[hits >> (2 * i) & 3] for i in range(n_flags))
+                lines.append(f"{row_prefix}{read_id}\t{flags}\n")
+                if index:
+                    index_hits.extend((i % (n_flags // 2) if paired else i, -1 if bit else 1, None, first_row)
+                                      for i in range(n_flags) for bit in (0, 1) if hits >> (2 * i + bit) & 1)
+            elif tsv and paired:
+                for mate, m_hits in enumerate(mate_hits, 1):
+                    for hit in m_hits:
+                        strand_str = "+" if hit['strand'] == 1 else "-"
+                        if index:
+                            index_hits.append((query_idx[hit['name']], hit['strand'], hit['errors'], len(lines)))
+                        lines.append(f"{row_prefix}{read_id}\t{mate}\t{hit['name']}\t{hit['start']}\t{hit['end']}\t{strand_str}\t{hit['errors']}\t{hit['match_seq']}\n")
+            elif tsv:
+                for hit in hits:
+                    strand_str = "+" if hit['strand'] == 1 else "-"
+                    if index:
+                        index_hits.append((query_idx[hit['name']], hit['strand'], hit['errors'], len(lines)))
+                    lines.append(f"{row_prefix}{read_id}\t{hit['name']}\t{hit['start']}\t{hit['end']}\t{strand_str}\t{hit['errors']}\t{hit['match_seq']}\n")
+            if index and len(lines) > first_row:
+                index_reads.append((read_id, first_row, len(lines) - first_row))
+        if len(reports) < keep:
+            reports.add(read_id, seq, hits)
+    if presence:
+        stats['signatures'] = signatures
+    if summary is not None:
+        stats['clusters'] = summary
+    if table is not None:
+        stats['columns'] = encode_chunk(table)
+    if index:
+        # Rows were recorded by number; turn them into byte offsets in the block
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + (len(line) if line.isascii() else len(line.encode())))
+        stats['index'] = ([(read_id, offsets[row], n_rows) for read_id, row, n_rows in index_reads],
+                          [(query, strand, errors, offsets[row]) for query, strand, errors, row in index_hits])
+    return "".join(lines).encode(), reports, stats
+
+def _process_read_batch(task):
+    """
+    Worker function for multiprocessing.
+    task is (batch, keep); returns (block, reports, stats), see _finish_batch.
+    """
+    batch, keep = task
+    stats = _new_stats()
+    return _finish_batch(_match_records(batch, stats), stats, keep)
+
+def _process_pair_batch(task):
+    """
+    Worker function for --r2: task is (pairs, keep) with pairs of
+    (header, r1_seq, r2_seq); both mates are matched and formatted
+    together. Counts are per pair; a pair is prefilter-rejected if both
+    mates are.
+    """
+    pairs, keep = task
+    stats = _new_stats()
+    batched = _match_batch(seq for _, seq1, seq2 in pairs for seq in (seq1, seq2))
+    matched = []
+    for header, seq1, seq2 in pairs:
+        stats['reads'] += 1
+        hits1, rejected1 = _match_read(seq1, stats, batched)
+        hits2, rejected2 = _match_read(seq2, stats, batched)
+        stats['prefilter_rejected'] += rejected1 and rejected2
+        matched.append((header, (seq1, seq2), (hits1, hits2)))
+    return _finish_batch(matched, stats, keep, paired=True)
+
+def _collapse_batch(batch, keep=0):
+    """
+    Collapses exact-duplicate sequences in a batch before dispatch.
+    Returns (headers, unique_seqs, seq_idx, keep) where read i has sequence
+    unique_seqs[seq_idx[i]]; qualities are dropped as workers do not use them.
+    """
+    headers = []
+    unique_seqs = []
+    seq_idx = []
+    seen = {}
     for header, seq, qual in batch:
-        hits = find_matches(seq, queries, max_errors)
-        results.append((header, seq, hits))
-    return results
+        idx = seen.get(seq)
+        if idx is None:
+            idx = seen[seq] = len(unique_seqs)
+            unique_seqs.append(seq)
+        headers.append(header)
+        seq_idx.append(idx)
+    return headers, unique_seqs, seq_idx, keep
+
+def _process_collapsed_batch(task):
+    """
+    Worker function for --collapse-duplicates: matches each unique sequence
+    once and expands the hits back to every read, in input order.
+    """
+    headers, unique_seqs, seq_idx, keep = task
+    stats = _new_stats()
+    batched = _match_batch(unique_seqs)
+    matched = [_match_read(seq, stats, batched) for seq in unique_seqs]
+    stats['reads'] = len(headers)
+    stats['collapsed'] = len(headers) - len(unique_seqs)
+
+    def expanded():
+        for header, i in zip(headers, seq_idx):
+            hits, rejected = matched[i]
+            stats['prefilter_rejected'] += rejected
+            yield header, unique_seqs[i], hits
+
+    return _finish_batch(expanded(), stats, keep)
+
+def _process_shard(shard):
+    """
+    Worker function for --sharded mode: parses its own byte range of the
+    input via mmap and sends back only the formatted output (plus the
+    leading reads the parent asked to keep for the HTML buffer).
+    """
+    filepath, start, end, keep = shard
+    stats = _new_stats()
+    return _finish_batch(_match_records(parse_fastq_range(filepath, start, end), stats), stats, keep)
+
+def _process_windows(pieces):
+    """
+    Worker function for --long-reads: matches read windows and returns
+    (windows, columns, stats), with windows holding (read_no, piece_idx,
+    n_pieces, mask, rejected) per window and columns a HitColumns with one
+    row per window (the read's header and its hits). Hits are shifted to
+    read coordinates and only kept if they start in the window's core;
+    mask is the presence bitmask in presence mode, else None.
+    """
+    stats = _new_stats()
+    presence = _worker_state['mode'] == 'presence'
+    columns = HitColumns((q['name'] for q in _worker_state['queries']), store_seqs=False)
+    batched = _match_batch(seq for _, _, seq, _, _, _, _ in pieces)
+    windows = []
+    for read_no, header, seq, offset, core, piece_idx, n_pieces in pieces:
+        hits, rejected = _match_read(seq, stats, batched)
+        if presence:
+            columns.add(header, seq, ())
+            windows.append((read_no, piece_idx, n_pieces, hits, rejected))
+        else:
+            columns.add(header, seq, [dict(h, start=h['start'] + offset, end=h['end'] + offset)
+                                      for h in hits if h['start'] < core])
+            windows.append((read_no, piece_idx, n_pieces, None, rejected))
+    return windows, columns, stats
+
+def _window_batches(fastq_gen, window, overlap, max_bases, read_seqs=None, keep_seq=None):
+    """
+    Splits reads into overlapping windows (see split_read_windows) and
+    yields batches of windows holding about max_bases bases, so one long
+    read is spread over several batches and workers. Sequences of reads
+    for which keep_seq(read_no) is true are stored in read_seqs for the
+    parent's reports.
+    """
+    batch = []
+    bases = 0
+    for read_no, (header, seq, qual) in enumerate(fastq_gen):
+        if read_seqs is not None and keep_seq(read_no):
+            read_seqs[read_no] = seq
+        pieces = split_read_windows(len(seq), window, overlap)
+        for piece_idx, (start, end, core) in enumerate(pieces):
+            batch.append((read_no, header, seq[start:end], start, core, piece_idx, len(pieces)))
+            bases += end - start
+            if bases >= max_bases:
+                yield batch
+                batch = []
+                bases = 0
+    if batch:
+        yield batch
+
+def _assemble_windows(results, query_names, presence, summary_sample, read_seqs, keep_leading, output_format='tsv',
+                      index=False):
+    """
+    Reassembles --long-reads window results (in any order) into whole
+    reads: merges hits across seams (or ORs presence masks) once all of a
+    read's windows are in, then formats the finished reads like a worker
+    batch (with index, including stats['index']). Yields (block, reports,
+    stats) per window batch.
+    """
+    pending = {}
+    finished = 0
+    for windows, columns, stats in results:
+        matched = []
+        for window_idx, (read_no, piece_idx, n_pieces, mask, rejected) in enumerate(windows):
+            entry = pending.setdefault(read_no, {'header': columns.read_ids[window_idx], 'hits': {}, 'rejected': True})
+            entry['hits'][piece_idx] = mask if presence else columns.hits(window_idx)
+            entry['rejected'] = entry['rejected'] and rejected
+            if len(entry['hits']) < n_pieces:
+                continue
+            del pending[read_no]
+            window_hits = [entry['hits'][i] for i in range(n_pieces)]
+            if presence:
+                merged = 0
+                for mask in window_hits:
+                    merged |= mask
+            else:
+                merged = merge_window_hits(window_hits)
+            stats['reads'] += 1
+            stats['prefilter_rejected'] += entry['rejected']
+            matched.append((entry['header'], read_seqs.pop(read_no, ''), merged))
+        keep = max(0, keep_leading - finished)
+        finished += len(matched)
+        yield _format_batch(matched, stats, keep, query_names, presence, summary_sample,
+                            output_format=output_format, index=index)
+
+def _process_file_batch(task):
+    """
+    Worker function for runs over several inputs: task is (file_idx,
+    prefix, worker_fn, inner_task). Runs worker_fn on inner_task with
+    prefix (the file column, or '' for none) starting every TSV row.
+    Returns (file_idx, block, reports, stats).
+    """
+    file_idx, prefix, worker_fn, inner = task
+    _worker_state['row_prefix'] = prefix
+    try:
+        block, reports, stats = worker_fn(inner)
+    finally:
+        _worker_state['row_prefix'] = ''
+    if 'columns' in stats:
+        stats['columns'] = set_chunk_file(stats['columns'], file_idx)
+    return file_idx, block, reports, stats
+
+def _expand_inputs(patterns, manifest=None):
+    """
+    Resolves the input arguments into a list of FASTQ paths: glob patterns
+    are expanded (sorted), plain paths kept as given, followed by the
+    non-empty, non-comment lines of the manifest file (relative paths are
+    taken relative to the manifest). Raises ValueError for a pattern that
+    matches nothing or an empty input list.
+    """
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matched = sorted(glob.glob(pattern))
+            if not matched:
+                raise ValueError(f"No input files match '{pattern}'")
+            paths.extend(matched)
+        else:
+            paths.append(pattern)
+    if manifest is not None:
+        base = os.path.dirname(manifest)
+        with open(manifest) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    paths.append(os.path.join(base, line))
+    if not paths:
+        raise ValueError("No input FASTQ files given")
+    return paths
+
+def _per_file_output(output, input_path):
+    """Output path for one input with --per-file-output, e.g. results.lane1.txt."""
+    name = Path(input_path).name
+    for suffix in ('.gz', '.fastq', '.fq'):
+        if name.endswith(suffix) and len(name) > len(suffix):
+            name = name[:-len(suffix)]
+    out = Path(output)
+    return str(out.with_name(f"{out.stem}.{name}{out.suffix}"))
+
+def _signature_label(mask, query_names):
+    """Human-readable presence signature, e.g. 'adapter_1(+) + adapter_2(-)'."""
+    parts = []
+    for i, name in enumerate(query_names):
+        if mask >> (2 * i) & 1:
+            parts.append(f"{name}(+)")
+        if mask >> (2 * i + 1) & 1:
+            parts.append(f"{name}(-)")
+    return " + ".join(parts) if parts else "No Matches"
 
 def _get_batches(fastq_gen, batch_size):
     """Yield batches of records from the FASTQ generator."""
@@ -30,72 +614,458 @@ def _get_batches(fastq_gen, batch_size):
     if batch:
         yield batch
 HTML_READ_LIMIT = 500
-SUMMARY_READ_LIMIT = 5000
+DEFAULT_OUTPUT = "softmatch_results.txt"
+SUMMARY_SAMPLE_SIZE = 500
 
-def main():
+def _main():
     parser = argparse.ArgumentParser(description="FAST soft-matching of adapters in FASTQ files.")
     parser.add_argument("query_csv", help="CSV file with columns: Name,Sequence")
-    parser.add_argument("input_fastq", help="Input FASTQ file")
+    parser.add_argument("input_fastq", nargs='*',
+                        help="Input FASTQ file(s) or glob patterns ('-' for standard input); "
+                             "several inputs share one worker pool")
+    parser.add_argument("--manifest", default=None, metavar="FILE",
+                        help="Text file listing further input FASTQ paths, one per line")
+    parser.add_argument("--per-file-output", action="store_true",
+                        help="Write one TSV per input (OUTPUT stem + input name) instead of a single TSV "
+                             "with a File column")
+    parser.add_argument("--r2", default=None, metavar="FILE",
+                        help="Mate FASTQ for paired-end input: pairs are read in lockstep with input_fastq (R1)")
     parser.add_argument("--errors", type=int, default=DEFAULT_ERRORS, help=f"Max errors allowed (default: {DEFAULT_ERRORS})")
+    parser.add_argument("--engine", choices=ENGINES + (WHITELIST_ENGINE, HAMMING_ENGINE), default=DEFAULT_ENGINE,
+                        help=f"Matching engine: 'regex' fuzzy patterns, 'myers' bit-vector kernel, 'whitelist' "
+                             f"hash index for large barcode lists or 'hamming' NumPy batch kernel (both mismatches "
+                             f"only) (default: {DEFAULT_ENGINE})")
+    parser.add_argument("--mismatches-only", action="store_true",
+                        help="Only allow substitutions, no insertions or deletions (same as --error-types i<=0,d<=0)")
+    parser.add_argument("--error-types", default=None, metavar="SPEC",
+                        help="Per-type limits within --errors, e.g. 's<=2,i<=1,d<=0' (substitutions, insertions, deletions)")
+    parser.add_argument("--whitelist-index", default=None, metavar="PATH",
+                        help="Whitelist engine: reuse the index stored at PATH, or build it and save it there")
+    parser.add_argument("--search-5p", type=int, default=None, metavar="N",
+                        help="Only search the first N bases of each read (per-query CSV column overrides)")
+    parser.add_argument("--search-3p", type=int, default=None, metavar="N",
+                        help="Only search the last N bases of each read (per-query CSV column overrides)")
+    parser.add_argument("--mode", choices=MODES, default=DEFAULT_MODE,
+                        help="'full' reports every hit; 'presence' only records which queries occur "
+                             "on which strand, one row per read, and implies --prefilter (default: full)")
+    parser.add_argument("--prefilter", action="store_true",
+                        help="Skip fuzzy matching on reads without an exact k-mer seed of any query")
+    parser.add_argument("--batch-regex", action="store_true",
+                        help="Screen each batch with one regex pass per query strand over the joined reads "
+                             "(regex engine, full mode, no prefilter or anchoring)")
+    parser.add_argument("--long-reads", action="store_true",
+                        help="Split long reads into overlapping windows matched across workers, "
+                             "with batches sized by bases (for Nanopore/PacBio reads)")
+    parser.add_argument("--window-size", type=int, default=LONG_READ_WINDOW,
+                        help=f"--long-reads: bases per window, plus query length + errors of overlap (default: {LONG_READ_WINDOW})")
+    parser.add_argument("--batch-bases", type=int, default=LONG_READ_BATCH_BASES,
+                        help=f"--long-reads: bases per worker batch (default: {LONG_READ_BATCH_BASES})")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help=f"Reads per worker batch (default: {BATCH_SIZE})")
+    parser.add_argument("--max-inflight", type=int, default=None,
+                        help=f"Max batches queued or running at once; bounds memory use (default: {INFLIGHT_PER_WORKER} per worker)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="Write batches as they complete instead of in input order")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help=f"Per-worker LRU cache of read sequence -> hits, in entries; 0 disables, "
+                             f"off with --long-reads (default: {DEFAULT_CACHE_SIZE})")
+    parser.add_argument("--collapse-duplicates", action="store_true",
+                        help="Collapse identical sequences within each batch before dispatching it")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Let workers parse record-aligned byte ranges of an uncompressed input via mmap")
+    parser.add_argument("--decompress-threads", type=int, default=DEFAULT_DECOMPRESS_THREADS,
+                        help=f"Threads for BGZF block decompression (default: {DEFAULT_DECOMPRESS_THREADS})")
+    parser.add_argument("--demux-dir", default=None, metavar="DIR",
+                        help="Also write every read to DIR/<signature>.fastq, split by the signature of its filtered hits")
+    parser.add_argument("--trim", action="store_true",
+                        help="--demux-dir: keep only the longest part of each read between hits (the insert)")
+    parser.add_argument("--demux-gzip", action="store_true",
+                        help="--demux-dir: gzip the per-signature FASTQ files")
+    parser.add_argument("--demux-max-open", type=int, default=DEFAULT_MAX_OPEN,
+                        help=f"--demux-dir: max output files open at once (default: {DEFAULT_MAX_OPEN})")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='tsv',
+                        help="'tsv' text rows, 'columnar' a binary hit table <output stem>.hits instead "
+                             "(see softmatch.hits.HitTable), or 'both' (default: tsv)")
+    parser.add_argument("--index", action="store_true",
+                        help="Write a sidecar index <output>.idx (read ID and per-query row offsets) for 'softmatch query'")
+    parser.add_argument("--checkpoint-every", type=int, default=0, metavar="N",
+                        help="Save a checkpoint <output>.ckpt every N batches, for --resume (default: off)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its last checkpoint (outputs are cut back to it); "
+                             f"checkpoints every {CHECKPOINT_EVERY} batches unless --checkpoint-every is given")
     parser.add_argument("--no_html", action="store_true", help="Disable HTML visualization output")
     parser.add_argument("--summary", action="store_true", help="Generate a clustered summary visualization")
-    parser.add_argument("--output", "-o", default="softmatch_results.txt", help="Output text file path")
+    parser.add_argument("--output", "-o", default=DEFAULT_OUTPUT,
+                        help="Output text file path, or '-' for standard output")
 
     args = parser.parse_args()
+    to_stdout = args.output == STDOUT
+    # With the TSV on standard output, progress and summaries go to stderr
+    log = functools.partial(print, file=sys.stderr if to_stdout else sys.stdout)
+    if to_stdout and args.per_file_output:
+        parser.error("--per-file-output cannot write to standard output")
+    # HTML and summary reports always go to files, named after --output
+    report_base = Path(DEFAULT_OUTPUT if to_stdout else args.output)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.max_inflight is not None and args.max_inflight < 1:
+        parser.error("--max-inflight must be at least 1")
+    max_inflight = args.max_inflight or INFLIGHT_PER_WORKER * (os.cpu_count() or 1)
+    try:
+        inputs = _expand_inputs(args.input_fastq, args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    # A single TSV over several inputs gets a leading File column
+    file_column = len(inputs) > 1 and not args.per_file_output
+    if args.per_file_output:
+        outputs = [_per_file_output(args.output, path) for path in inputs]
+        if len(set(outputs)) < len(outputs):
+            parser.error("--per-file-output needs inputs with distinct file names")
+    else:
+        outputs = [args.output]
+    for name in ('search_5p', 'search_3p'):
+        if getattr(args, name) is not None and getattr(args, name) < 0:
+            parser.error(f"--{name.replace('_', '-')} must not be negative")
+    if args.cache_size < 0:
+        parser.error("--cache-size must not be negative")
+    if [args.r2, *inputs].count(STDIN) > 1:
+        parser.error("Standard input ('-') can only be read once")
+    if args.sharded and STDIN in inputs:
+        parser.error("--sharded needs input files, not standard input")
+    if args.sharded and not all(os.path.isfile(path) for path in inputs):
+        # Workers map byte ranges of the file, which pipes do not have
+        parser.error("--sharded needs regular input files, not pipes")
+    if args.sharded and any(detect_compression(path) is not None for path in inputs):
+        parser.error("--sharded requires uncompressed FASTQ files")
+    if len(inputs) > 1 and (args.r2 is not None or args.long_reads):
+        parser.error("--r2 and --long-reads take a single input FASTQ")
+    if args.sharded and args.collapse_duplicates:
+        parser.error("--collapse-duplicates cannot be combined with --sharded")
+    if args.r2 is not None and (args.sharded or args.collapse_duplicates or args.long_reads):
+        parser.error("--r2 cannot be combined with --sharded, --collapse-duplicates or --long-reads")
+    if args.long_reads:
+        if args.sharded or args.collapse_duplicates:
+            parser.error("--long-reads cannot be combined with --sharded or --collapse-duplicates")
+        if args.search_5p is not None or args.search_3p is not None:
+            parser.error("--long-reads cannot be combined with --search-5p/--search-3p")
+        if args.window_size < 1 or args.batch_bases < 1:
+            parser.error("--window-size and --batch-bases must be at least 1")
+    if args.demux_dir is None and (args.trim or args.demux_gzip):
+        parser.error("--trim and --demux-gzip require --demux-dir")
+    if args.demux_dir is not None:
+        if args.mode != 'full' or args.r2 or args.long_reads or args.collapse_duplicates:
+            parser.error("--demux-dir only supports --mode full, without --r2, --long-reads or --collapse-duplicates")
+        if args.demux_max_open < 1:
+            parser.error("--demux-max-open must be at least 1")
+    if args.format != 'tsv':
+        if args.mode != 'full' or args.r2 or args.per_file_output:
+            parser.error("--format columnar/both only supports --mode full, without --r2 or --per-file-output")
+        if args.format == 'columnar' and to_stdout:
+            parser.error("--format columnar writes no TSV; use --format both with --output -")
+    if args.index and (to_stdout or args.per_file_output or args.format == 'columnar'):
+        parser.error("--index needs a single TSV file: not with --output -, --per-file-output or --format columnar")
+    if args.checkpoint_every < 0:
+        parser.error("--checkpoint-every must not be negative")
+    if args.resume and not args.checkpoint_every:
+        args.checkpoint_every = CHECKPOINT_EVERY
+    checkpointing = args.checkpoint_every > 0
+    if checkpointing:
+        if to_stdout or STDIN in inputs or args.r2 == STDIN:
+            parser.error("Checkpoints need file input and output, not standard input or output")
+        if args.unordered or args.per_file_output or args.long_reads or args.index or args.demux_dir:
+            parser.error("Checkpoints cannot be combined with --unordered, --per-file-output, --long-reads, "
+                         "--index or --demux-dir")
+    if args.engine == WHITELIST_ENGINE:
+        if args.mode != 'full' or args.prefilter or args.batch_regex:
+            parser.error("--engine whitelist only supports --mode full, without --prefilter or --batch-regex")
+    elif args.whitelist_index is not None:
+        parser.error("--whitelist-index requires --engine whitelist")
+    error_types = {}
+    if args.error_types is not None:
+        try:
+            error_types = parse_error_types(args.error_types)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.mismatches_only:
+        if error_types.get('i', 0) or error_types.get('d', 0):
+            parser.error("--mismatches-only conflicts with insertions or deletions in --error-types")
+        error_types.update(MISMATCHES_ONLY)
+    if args.engine in (WHITELIST_ENGINE, HAMMING_ENGINE):
+        # Substitution-only engines: indels cannot be allowed, a substitution limit lowers --errors
+        if error_types.get('i', 0) or error_types.get('d', 0):
+            parser.error(f"--engine {args.engine} only counts substitutions")
+        args.errors = min(args.errors, error_types.get('s', args.errors))
+        error_types = {}
+    elif args.engine == 'myers' and error_types:
+        parser.error("--engine myers counts edit distance; use --engine regex or hamming for per-type limits")
+    if args.engine == HAMMING_ENGINE and hamming.np is None:
+        parser.error("--engine hamming needs NumPy: pip install 'softmatch[numpy]'")
 
     # 1. Load Queries
-    print(f"Loading queries from {args.query_csv}...")
-    queries = parse_queries(args.query_csv)
-
-    # Pre-compile queries for speed
-    for q in queries:
-        expanded_fwd = expand_ambiguous(q['seq'])
-        q['fwd_re'] = regex.compile(f"({expanded_fwd}){{e<={args.errors}}}", regex.BESTMATCH)
-        rev_seq = reverse_complement(q['seq'])
-        q['rev_seq'] = rev_seq
-        if rev_seq != q['seq']:
-            expanded_rev = expand_ambiguous(rev_seq)
-            q['rev_re'] = regex.compile(f"({expanded_rev}){{e<={args.errors}}}", regex.BESTMATCH)
-        else:
-            q['rev_re'] = None
+    log(f"Loading queries from {args.query_csv}...")
+    try:
+        queries = parse_queries(args.query_csv)
+    except ValueError as e:
+        parser.error(str(e))
 
     query_names = [q['name'] for q in queries]
-    print(f"Loaded {len(queries)} query sequences.")
+    log(f"Loaded {len(queries)} query sequences.")
+    # Paired-end presence flags, reports and signatures name each query per mate
+    report_names = mate_names(query_names) if args.r2 else query_names
+    if args.long_reads and any(q.get('search_5p') is not None or q.get('search_3p') is not None for q in queries):
+        parser.error("--long-reads does not support per-query window columns")
+
+    whitelist = None
+    if args.engine == WHITELIST_ENGINE:
+        if any(q.get('search_5p') is not None or q.get('search_3p') is not None for q in queries):
+            parser.error("--engine whitelist does not support per-query window columns; use --search-5p/--search-3p")
+        try:
+            whitelist, reused = load_or_build_whitelist_index(queries, args.errors, args.whitelist_index)
+        except ValueError as e:
+            parser.error(str(e))
+        log(f"{'Loaded' if reused else 'Built'} whitelist index over {len(queries)} sequences.")
+
+    seed_index = None
+    # Candidate windows never change whether a query is present, so the seed
+    # prefilter is always safe (and always on) in presence mode
+    if args.prefilter or args.mode == 'presence':
+        seed_index = build_seed_index(queries, args.errors)
+        if seed_index['always']:
+            log(f"Note: {len(seed_index['always'])} query strand(s) too short or ambiguous to seed; always verified.")
 
     # 2. Process FASTQ
-    print(f"Scanning {args.input_fastq}...")
+    if len(inputs) > 1:
+        log(f"Scanning {len(inputs)} input files...")
+    else:
+        log(f"Scanning {inputs[0]}{' and ' + args.r2 if args.r2 else ''}...")
 
     results_for_html = []
-    results_for_summary = []
-    total_reads = 0
-    reads_with_hits = 0
-
-    # Open output text file
-    with open(args.output, 'w') as out_f:
-        out_f.write("ReadID\tAdapter\tStart\tEnd\tStrand\tErrors\tMatchedSequence\n")
-
-        fastq_gen = parse_fastq(args.input_fastq)
-        batches = _get_batches(fastq_gen, BATCH_SIZE)
-
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            # Use executor.map to maintain order
-            for batch_results in executor.map(_process_read_batch, batches,
-                                            itertools.repeat(queries),
-                                            itertools.repeat(args.errors)):
-                for header, seq, hits in batch_results:
-                    total_reads += 1
-                    if total_reads % 10000 == 0:
-                        print(f"Processed {total_reads} reads...", end='\r')
-
-                    read_id = header.split()[0] # Take first part of header
-                    if hits:
-                        reads_with_hits += 1
-
-                        # Write to text file
-                        for hit in hits:
-                            strand_str = "+" if hit['strand'] == 1 else "-"
-                            out_f.write(f"{read_id}\t{hit['name']}\t{hit['start']}\t{hit['end']}\t{strand_str}\t{hit['errors']}\t{hit['match_seq']}\n")
+    summary = SignatureSummary(SUMMARY_SAMPLE_SIZE) if args.summary and args.mode == 'full' else None
+    counters = collections.Counter()
+    file_counters = [collections.Counter() for _ in inputs]
+    signature_counts = collections.Counter()
+    presence = args.mode == 'presence'
+    if presence and (args.summary or not args.no_html):
+        log("Note: HTML and summary reports need hit positions and are skipped in presence mode.")
+        args.no_html = True
+        args.summary = False
+
+    # Batches committed to the outputs, and the input position after the last one:
+    # (file index, reads done in that file, byte offset or None)
+    committed = 0
+    position = None
+    output_size = 0
+    hits_size = 0
+    state = None
+    if checkpointing:
+        ckpt_path = checkpoint_path(args.output)
+        fingerprint = run_fingerprint({k: v for k, v in vars(args).items() if k not in RESUMABLE_OPTIONS},
+                                      args.query_csv, inputs + [args.r2])
+    if args.resume:
+        try:
+            state = load_checkpoint(ckpt_path, fingerprint)
+        except ValueError as e:
+            parser.error(str(e))
+        if state is None:
+            log(f"No checkpoint at {ckpt_path}; starting from the beginning.")
+        else:
+            committed = state['batches']
+            position = state['position']
+            counters = state['counters']
+            file_counters = state['file_counters']
+            signature_counts = state['signature_counts']
+            summary = state['summary']
+            results_for_html = state['results_for_html']
+            log(f"Resuming after {committed} batches ({counters['reads']} reads).")
+
+    # Workers send back the leading reads (with sequences) for the HTML buffer
+    keep_leading = 0 if args.no_html else HTML_READ_LIMIT
+    # Batches are numbered across all inputs, so only the leading reads of the run are kept
+    batch_no = itertools.count(committed)
+    # Input positions of the batches in flight, in order (checkpointed runs only)
+    positions = collections.deque()
+
+    def keep_for(batch_idx):
+        return max(0, keep_leading - batch_idx * args.batch_size)
+
+    def input_batches(path, reads_done=0, offset=None):
+        """
+        Batches of one input's records (pairs with --r2), starting after
+        reads_done records or at byte offset. Yields (batch, reads_done,
+        offset) with the position after the batch; checkpointed runs
+        parse uncompressed files by byte range to know the offset.
+        """
+        if (checkpointing and not args.r2 and os.path.isfile(path) and os.path.getsize(path)
+                and detect_compression(path) is None):
+            records = parse_fastq_range(path, offset or 0, os.path.getsize(path), with_offsets=True)
+            for batch in _get_batches(records, args.batch_size):
+                reads_done += len(batch)
+                yield [record[:3] for record in batch], reads_done, batch[-1][3]
+            return
+        if args.r2:
+            records = parse_fastq_pairs(path, args.r2, args.decompress_threads)
+        else:
+            records = parse_fastq(path, args.decompress_threads)
+        # Compressed input cannot seek, so a resumed run re-reads (but does not match) skipped reads
+        records = itertools.islice(records, reads_done, None)
+        for batch in _get_batches(records, args.batch_size):
+            reads_done += len(batch)
+            yield batch, reads_done, None
+
+    def file_tasks(file_idx, path, start=None):
+        """
+        (worker_fn, (inner task, reads_done, offset) ...) over one input,
+        see _process_file_batch and input_batches; start is the
+        (reads_done, offset) to resume from.
+        """
+        reads_done, offset = start or (0, None)
+        if args.sharded:
+            # Workers parse their own ranges; only the first shard keeps hit-less
+            # reads, for the HTML buffer
+            return _process_shard, (((path, start, end, keep_leading if next(batch_no) == 0 else 0), None, end)
+                                    for start, end in fastq_shards(path, SHARD_BYTES) if end > (offset or 0))
+        batches = input_batches(path, reads_done, offset)
+        if args.collapse_duplicates:
+            return _process_collapsed_batch, ((_collapse_batch(batch, keep_for(next(batch_no))), done, end)
+                                              for batch, done, end in batches)
+        worker_fn = _process_pair_batch if args.r2 else _process_read_batch
+        return worker_fn, (((batch, keep_for(next(batch_no))), done, end) for batch, done, end in batches)
+
+    def all_tasks():
+        # Inputs are queued back to back into one pool, so workers move on to
+        # the next file while the last batches of the previous one finish
+        for file_idx, path in enumerate(inputs):
+            if position is not None and file_idx < position[0]:
+                continue
+            start = position[1:] if position is not None and file_idx == position[0] else None
+            prefix = f"{path}\t" if file_column else ""
+            worker_fn, tasks = file_tasks(file_idx, path, start)
+            for task, reads_done, offset in tasks:
+                if checkpointing:
+                    positions.append((file_idx, reads_done, offset))
+                yield file_idx, prefix, worker_fn, task
+
+    if presence:
+        header = ("ReadID\t" + "\t".join(report_names) + "\n").encode()
+    elif args.r2:
+        header = b"ReadID\tMate\tAdapter\tStart\tEnd\tStrand\tErrors\tMatchedSequence\n"
+    else:
+        header = b"ReadID\tAdapter\tStart\tEnd\tStrand\tErrors\tMatchedSequence\n"
+    if file_column:
+        header = b"File\t" + header
+
+    # TSV rows arrive pre-formatted from the workers and are written by a
+    # background thread per output file with large buffered writes. Output
+    # files are opened on their first batch and, when batches arrive in
+    # input order, closed once the next file's batches start.
+    with contextlib.ExitStack() as outputs_stack:
+        writers = {}
+
+        def writer_for(file_idx):
+            out_idx = file_idx if args.per_file_output else 0
+            if out_idx not in writers:
+                if args.per_file_output and not args.unordered:
+                    for done_idx in list(writers):
+                        writer, out_f = writers.pop(done_idx)
+                        writer.close()
+                        out_f.close()
+                if to_stdout:
+                    out_f = sys.stdout.buffer
+                elif state is not None:
+                    # Resumed: continue the TSV as it was at the checkpoint
+                    truncate_output(outputs[out_idx], state['output_size'])
+                    out_f = outputs_stack.enter_context(open(outputs[out_idx], 'ab', buffering=WRITE_BUFFER_SIZE))
+                else:
+                    out_f = outputs_stack.enter_context(open(outputs[out_idx], 'wb', buffering=WRITE_BUFFER_SIZE))
+                # On a pipe, every batch is flushed so downstream tools can start on it
+                writer = outputs_stack.enter_context(BackgroundWriter(out_f, max_queued=max_inflight,
+                                                                      flush=to_stdout))
+                if state is None:
+                    writer.write(header)
+                writers[out_idx] = (writer, out_f)
+            return writers[out_idx][0]
+
+        if not args.per_file_output and args.format != 'columnar':
+            writer_for(0)
+            output_size = state['output_size'] if state is not None else len(header)
 
+        index_writer = None
+        if args.index:
+            index = IndexWriter(index_path(args.output), query_names)
+
+            def finish_index(exc_type, exc, tb):
+                # Runs once the index writer thread is done; a failed run leaves no index
+                index.close(None if exc_type else output_size)
+            outputs_stack.push(finish_index)
+            index_writer = outputs_stack.enter_context(BackgroundWriter(index, max_queued=max_inflight))
+
+        hits_writer = None
+        if args.format != 'tsv':
+            hits_path = report_base.with_suffix('.hits')
+            if state is not None:
+                truncate_output(hits_path, state['hits_size'])
+                hits_size = state['hits_size']
+            hits_f = outputs_stack.enter_context(open(hits_path, 'ab' if state is not None else 'wb',
+                                                      buffering=WRITE_BUFFER_SIZE))
+            hits_writer = outputs_stack.enter_context(BackgroundWriter(hits_f, max_queued=max_inflight))
+            if state is None:
+                table_header = hit_table_header(query_names, inputs)
+                hits_writer.write(table_header)
+                hits_size = len(table_header)
+
+        demux_writer = None
+        if args.demux_dir is not None:
+            # Entered first so it is closed last, after its writer thread finished
+            demux = outputs_stack.enter_context(DemuxWriter(args.demux_dir, args.demux_max_open, args.demux_gzip))
+            demux_writer = outputs_stack.enter_context(BackgroundWriter(demux, max_queued=max_inflight))
+
+        if args.long_reads:
+            # Windows overlap by the longest possible match so none is lost at a seam
+            overlap = max((len(q['seq']) for q in queries), default=0) + args.errors
+            read_seqs = {}
+            fastq_gen = parse_fastq(inputs[0], args.decompress_threads)
+            worker_fn = _process_windows
+            batches = _window_batches(fastq_gen, args.window_size, overlap, args.batch_bases, read_seqs,
+                                      lambda read_no: summary is not None or read_no < keep_leading)
+        else:
+            worker_fn = _process_file_batch
+            batches = all_tasks()
+
+        settings = _worker_settings(
+            queries, args.errors, engine=args.engine, seed_index=seed_index,
+            # Long-read windows of --window-size bases are practically never repeated
+            cache_size=0 if args.long_reads else args.cache_size,
+            search_5p=args.search_5p, search_3p=args.search_3p, mode=args.mode,
+            summary_sample=SUMMARY_SAMPLE_SIZE if summary is not None else 0, batch_regex=args.batch_regex,
+            whitelist=whitelist, error_types=error_types, demux=args.demux_dir is not None, trim=args.trim,
+            output_format=args.format, index=args.index)
+        # Queries are compiled once per worker by the initializer
+        with concurrent.futures.ProcessPoolExecutor(initializer=_init_worker, initargs=(settings,)) as executor:
+            # Keep at most max_inflight batches queued so memory stays bounded
+            results = bounded_map(executor, worker_fn, batches, max_inflight, ordered=not args.unordered)
+            if args.long_reads:
+                results = ((0,) + result for result in _assemble_windows(
+                    results, query_names, presence, SUMMARY_SAMPLE_SIZE if summary is not None else 0,
+                    read_seqs, keep_leading, args.format, args.index))
+            for file_idx, block, reports, batch_stats in results:
+                if args.format != 'columnar':
+                    writer_for(file_idx).write(block)
+                if index_writer is not None:
+                    index_writer.write((output_size,) + batch_stats.pop('index'))
+                output_size += len(block)
+                if hits_writer is not None:
+                    chunk = batch_stats.pop('columns')
+                    hits_writer.write(chunk)
+                    hits_size += len(chunk)
+                signature_counts.update(batch_stats.pop('signatures', {}))
+                if demux_writer is not None:
+                    demux_writer.write(batch_stats.pop('demux'))
+                if summary is not None:
+                    summary.merge(batch_stats.pop('clusters'))
+                counters.update(batch_stats)
+                file_counters[file_idx].update(batch_stats)
+
+                for read_id, seq, hits in reports:
                     # Save to HTML buffer (limit check)
                     if not args.no_html and len(results_for_html) < HTML_READ_LIMIT:
                         results_for_html.append({
@@ -104,34 +1074,140 @@ def main():
                             'hits': hits
                         })
 
-                    # Save to Summary buffer (limit check)
-                    if args.summary and len(results_for_summary) < SUMMARY_READ_LIMIT:
-                        results_for_summary.append({
-                            'id': read_id,
-                            'seq': seq,
-                            'hits': hits
-                        })
+                if checkpointing:
+                    committed += 1
+                    position = positions.popleft()
+                    if committed % args.checkpoint_every == 0:
+                        # Everything up to this batch must be on disk before the
+                        # checkpoint claims it
+                        synced = list(writers.values())
+                        if hits_writer is not None:
+                            synced.append((hits_writer, hits_f))
+                        for writer, out_f in synced:
+                            writer.flush()
+                            os.fsync(out_f.fileno())
+                        save_checkpoint(ckpt_path, {
+                            'fingerprint': fingerprint, 'batches': committed, 'position': position,
+                            'counters': counters, 'file_counters': file_counters,
+                            'signature_counts': signature_counts, 'summary': summary,
+                            'results_for_html': results_for_html,
+                            'output_size': output_size, 'hits_size': hits_size})
+
+                log(f"Processed {counters['reads']} reads...", end='\r')
+
+        # Inputs without a single read still get their (header-only) TSV
+        if args.per_file_output:
+            for file_idx in range(len(inputs)):
+                if not file_counters[file_idx]['reads']:
+                    writer_for(file_idx)
 
-    print(f"\nDone. Processed {total_reads} reads.")
-    print(f"Reads with at least one match: {reads_with_hits}")
-    print(f"Text results written to: {args.output}")
+    if checkpointing and os.path.exists(ckpt_path):
+        # The run is complete; a later --resume starts afresh
+        os.remove(ckpt_path)
+
+    total_reads = counters['reads']
+    if args.r2:
+        log(f"\nDone. Processed {total_reads} read pairs.")
+        log(f"Pairs with at least one match: {counters['reads_with_hits']}")
+    else:
+        log(f"\nDone. Processed {total_reads} reads.")
+        log(f"Reads with at least one match: {counters['reads_with_hits']}")
+    if presence:
+        log("Reads per query (forward / reverse / either):")
+        for i, name in enumerate(report_names):
+            fwd = sum(n for mask, n in signature_counts.items() if mask >> (2 * i) & 1)
+            rev = sum(n for mask, n in signature_counts.items() if mask >> (2 * i + 1) & 1)
+            either = sum(n for mask, n in signature_counts.items() if mask >> (2 * i) & 3)
+            log(f"  {name}: {fwd} / {rev} / {either}")
+        log("Reads per signature:")
+        for mask, n in signature_counts.most_common():
+            log(f"  {_signature_label(mask, report_names)}: {n}")
+    if len(inputs) > 1:
+        log("Per file (reads / with a match):")
+        for path, file_stats in zip(inputs, file_counters):
+            log(f"  {path}: {file_stats['reads']} / {file_stats['reads_with_hits']}")
+    if seed_index is not None and total_reads:
+        prefilter_rejected = counters['prefilter_rejected']
+        passed = total_reads - prefilter_rejected
+        log(f"Prefilter: {passed} reads passed ({100 * passed / total_reads:.1f}%), "
+              f"{prefilter_rejected} rejected ({100 * prefilter_rejected / total_reads:.1f}%)")
+    if counters['cache_lookups']:
+        log(f"Sequence cache: {counters['cache_hits']} of {counters['cache_lookups']} sequences reused "
+              f"earlier results ({100 * counters['cache_hits'] / counters['cache_lookups']:.1f}%)")
+    if args.collapse_duplicates and total_reads:
+        log(f"Duplicate collapsing: {counters['collapsed']} reads ({100 * counters['collapsed'] / total_reads:.1f}%) "
+              f"shared a sequence with an earlier read in their batch")
+    if args.demux_dir is not None:
+        log(f"{'Trimmed reads' if args.trim else 'Reads'} written to {len(demux.files())} signature file(s) in {args.demux_dir}")
+    if args.per_file_output:
+        log(f"Text results written to {len(outputs)} file(s): {outputs[0]}{', ...' if len(outputs) > 1 else ''}")
+    elif not to_stdout and args.format != 'columnar':
+        log(f"Text results written to: {args.output}")
+    if args.index:
+        log(f"Index written to: {index_path(args.output)} (see 'softmatch query --help')")
+    if args.format != 'tsv':
+        log(f"Hit table written to: {hits_path}")
 
     # 3. Generate HTML
     if not args.no_html:
-        html_path = Path(args.output).with_suffix('.html')
-        print(f"Generating interactive report: {html_path}")
+        html_path = report_base.with_suffix('.html')
+        log(f"Generating interactive report: {html_path}")
         if len(results_for_html) == HTML_READ_LIMIT:
-            print(f"Note: HTML report limited to first {HTML_READ_LIMIT} reads to ensure performance.")
-        generate_html(results_for_html, html_path, query_names=query_names)
+            log(f"Note: HTML report limited to first {HTML_READ_LIMIT} reads to ensure performance.")
+        generate_html(results_for_html, html_path, query_names=report_names)
 
     # 4. Generate Summary
-    if args.summary:
-        summary_path = Path(args.output).parent / (Path(args.output).stem + "_summary.html")
-        print(f"Generating clustered summary: {summary_path}")
-        if len(results_for_summary) == SUMMARY_READ_LIMIT:
-            print(f"Note: Summary limited to first {SUMMARY_READ_LIMIT} reads.")
-        clusters = cluster_reads(results_for_summary)
-        generate_cluster_html(clusters, summary_path, query_names=query_names)
+    if summary is not None:
+        summary_path = report_base.parent / (report_base.stem + "_summary.html")
+        log(f"Generating clustered summary: {summary_path}")
+        if any(n > SUMMARY_SAMPLE_SIZE for n in summary.counts.values()):
+            log(f"Note: Summary counts cover all reads; plots show up to {SUMMARY_SAMPLE_SIZE} sampled reads per signature.")
+        generate_cluster_html(summary.clusters(), summary_path, query_names=report_names, counts=summary.counts)
+
+def _query_main(argv):
+    """softmatch query: look up rows of an indexed results TSV (see --index)."""
+    parser = argparse.ArgumentParser(prog="softmatch query",
+                                     description="Look up reads or filter hits in an indexed softmatch results TSV.")
+    parser.add_argument("results", help="Results TSV written with --index")
+    parser.add_argument("--read", action="append", default=[], metavar="ID",
+                        help="Show the rows of this read ID (repeatable)")
+    parser.add_argument("--adapter", default=None, metavar="NAME", help="Show rows with a hit of this query")
+    parser.add_argument("--strand", choices=tuple(STRANDS), default=None, help="--adapter: only hits on this strand")
+    parser.add_argument("--max-errors", type=int, default=None, metavar="N", help="--adapter: only hits with at most N errors")
+    parser.add_argument("--limit", type=int, default=None, metavar="N", help="--adapter: show at most N rows")
+    parser.add_argument("--count", action="store_true", help="--adapter: only print the number of matching rows")
+    parser.add_argument("--index", default=None, metavar="PATH", help="Index file (default: RESULTS.idx)")
+    args = parser.parse_args(argv)
+    if not args.read and args.adapter is None:
+        parser.error("give --read and/or --adapter")
+    try:
+        with ResultIndex(args.results, args.index) as result_index:
+            strand = STRANDS.get(args.strand)
+            if args.count:
+                if args.adapter is None:
+                    parser.error("--count requires --adapter")
+                print(result_index.count(args.adapter, strand, args.max_errors))
+                return
+            out = sys.stdout
+            out.write(result_index.header)
+            for read_id in args.read:
+                out.writelines(result_index.lookup(read_id))
+            if args.adapter is not None:
+                out.writelines(result_index.filter(args.adapter, strand, args.max_errors, args.limit))
+    except ValueError as e:
+        parser.error(str(e))
+
+def main():
+    try:
+        if sys.argv[1:2] == ['query']:
+            _query_main(sys.argv[2:])
+            return
+        _main()
+    except BrokenPipeError:
+        # The reader of --output - went away (e.g. `| head`): exit quietly like
+        # other pipeline tools, without flushing into the closed pipe again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,17 @@
+import bisect
+import random
+from .hits import HitColumns
+
 def filter_hits(hits):
     """
     Deduplicate overlapping hits.
     Sort by errors (ascending), then by length (descending), then by start.
     Greedily pick non-overlapping hits.
+    Picked hits are disjoint, so they are kept sorted by start and each
+    candidate only needs checking against one neighbour: O(n log n)
+    comparisons. Inserting into the sorted lists still moves O(n) items
+    per picked hit (O(n^2) in the worst case), but those moves are memmoves
+    that cost little next to the comparisons at realistic hit counts.
     """
     if not hits:
         return []
@@ -11,19 +20,60 @@ def filter_hits(hits):
     sorted_hits = sorted(hits, key=lambda x: (x['errors'], -x['len'], x['start']))
 
     picked = []
+    starts = []
+    ends = []
 
     for h in sorted_hits:
-        overlap = False
-        for p in picked:
-            # Check for overlap: h starts before p ends AND h ends after p starts
-            if h['start'] < p['end'] and h['end'] > p['start']:
-                overlap = True
-                break
-        if not overlap:
-            picked.append(h)
-
-    # Sort by start for final output
-    return sorted(picked, key=lambda x: x['start'])
+        # Among picked hits starting before h ends, the last one reaches furthest;
+        # h overlaps a picked hit iff it overlaps that one
+        i = bisect.bisect_left(starts, h['end'])
+        if i > 0 and ends[i - 1] > h['start']:
+            continue
+        starts.insert(i, h['start'])
+        ends.insert(i, h['end'])
+        picked.insert(i, h)
+
+    # Picked hits are already sorted by start
+    return picked
+
+def _cluster_entry(read):
+    """
+    Filters a read's hits and returns (signature, entry) where signature is
+    a tuple of (adapter_name, strand) and entry holds what the cluster
+    visualization needs.
+    """
+    hits = filter_hits(read['hits'])
+
+    # Signature is a tuple of (adapter_name, strand)
+    signature = tuple((h['name'], h['strand']) for h in hits)
+
+    # Calculate distances between hits
+    distances = []
+    for i in range(len(hits) - 1):
+        distances.append(hits[i+1]['start'] - hits[i]['end'])
+
+    return signature, {
+        'id': read.get('id', 'unknown'),
+        'seq_len': len(read['seq']),
+        'hits': hits,
+        'distances': tuple(distances)
+    }
+
+def _column_entry(columns, read_idx):
+    """Rebuilds the _cluster_entry entry of one read stored in a HitColumns."""
+    hits = columns.hits(read_idx)
+    return {
+        'id': columns.read_ids[read_idx],
+        'seq_len': columns.seq_len(read_idx),
+        'hits': hits,
+        'distances': tuple(hits[i + 1]['start'] - hits[i]['end'] for i in range(len(hits) - 1))
+    }
+
+def _sort_clusters(clusters):
+    # Sort reads within each cluster by distances and then by sequence length
+    for sig in clusters:
+        clusters[sig].sort(key=lambda x: (x['distances'], x['seq_len']))
+    return clusters
 
 def cluster_reads(reads_with_hits):
     """
@@ -32,28 +82,87 @@ def cluster_reads(reads_with_hits):
     """
     clusters = {}
     for read in reads_with_hits:
-        hits = filter_hits(read['hits'])
+        signature, entry = _cluster_entry(read)
+        clusters.setdefault(signature, []).append(entry)
+    return _sort_clusters(clusters)
+
+class SignatureSummary:
+    """
+    Streaming counterpart of cluster_reads for whole-file summaries.
+    Keeps an exact read count for every signature plus a uniform reservoir
+    sample of at most sample_size reads per signature, so memory stays
+    bounded however many reads are added. Summaries built in different
+    workers can be combined with merge(); samples are pickled as one
+    HitColumns so they are cheap to send between processes.
+    """
+    def __init__(self, sample_size, seed=0):
+        self.sample_size = sample_size
+        self.counts = {}
+        self.samples = {}
+        self._rng = random.Random(seed)
 
-        # Signature is a tuple of (adapter_name, strand)
-        signature = tuple((h['name'], h['strand']) for h in hits)
+    def add(self, read):
+        """Adds a read dict ({'id', 'seq', 'hits'}) to the summary."""
+        signature, entry = _cluster_entry(read)
+        n = self.counts.get(signature, 0) + 1
+        self.counts[signature] = n
+        sample = self.samples.setdefault(signature, [])
+        if len(sample) < self.sample_size:
+            sample.append(entry)
+        else:
+            j = self._rng.randrange(n)
+            if j < self.sample_size:
+                sample[j] = entry
 
-        if signature not in clusters:
-            clusters[signature] = []
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        names = sorted({name for signature in self.samples for name, _ in signature})
+        columns = HitColumns(names, store_seqs=False)
+        for sample in self.samples.values():
+            for entry in sample:
+                columns.add(entry['id'], None, entry['hits'], seq_len=entry['seq_len'])
+        state['samples'] = ([(sig, len(sample)) for sig, sample in self.samples.items()], columns)
+        return state
 
-        # Calculate distances between hits
-        distances = []
-        for i in range(len(hits) - 1):
-            distances.append(hits[i+1]['start'] - hits[i]['end'])
+    def __setstate__(self, state):
+        sizes, columns = state['samples']
+        samples = {}
+        read_idx = 0
+        for signature, size in sizes:
+            samples[signature] = [_column_entry(columns, i) for i in range(read_idx, read_idx + size)]
+            read_idx += size
+        state['samples'] = samples
+        self.__dict__.update(state)
 
-        clusters[signature].append({
-            'id': read.get('id', 'unknown'),
-            'seq_len': len(read['seq']),
-            'hits': hits,
-            'distances': tuple(distances)
-        })
+    def merge(self, other):
+        """
+        Folds another summary into this one. Each merged reservoir is drawn
+        from both samples in proportion to the reads they stand for, so it
+        stays a uniform sample of the combined reads.
+        """
+        for signature, n_other in other.counts.items():
+            n_self = self.counts.get(signature, 0)
+            a = self.samples.get(signature, [])
+            b = other.samples[signature]
+            self.counts[signature] = n_self + n_other
+            if n_self == len(a) and n_other == len(b) and len(a) + len(b) <= self.sample_size:
+                # Both samples are complete and fit: keep every read, in order
+                self.samples[signature] = a + b
+                continue
 
-    # Sort reads within each cluster by distances and then by sequence length
-    for sig in clusters:
-        clusters[sig].sort(key=lambda x: (x['distances'], x['seq_len']))
+            a = list(a)
+            b = list(b)
+            remaining_a, remaining_b = n_self, n_other
+            merged = []
+            while len(merged) < self.sample_size and (a or b):
+                if b and (not a or self._rng.random() * (remaining_a + remaining_b) >= remaining_a):
+                    merged.append(b.pop(self._rng.randrange(len(b))))
+                    remaining_b -= 1
+                else:
+                    merged.append(a.pop(self._rng.randrange(len(a))))
+                    remaining_a -= 1
+            self.samples[signature] = merged
 
-    return clusters
+    def clusters(self):
+        """Sampled reads per signature, sorted like cluster_reads output."""
+        return _sort_clusters({sig: list(sample) for sig, sample in self.samples.items()})
@@ -0,0 +1,173 @@
+import concurrent.futures
+import gzip
+import io
+import itertools
+import struct
+import sys
+import zlib
+from .pipeline import bounded_map
+
+GZIP_MAGIC = b'\x1f\x8b'
+BGZF_BLOCKS_PER_TASK = 16
+DEFAULT_DECOMPRESS_THREADS = 4
+# Input path standing for standard input
+STDIN = '-'
+
+def detect_compression(filepath):
+    """
+    Sniffs the magic bytes of a file.
+    Returns 'bgzf', 'gzip' or None for uncompressed input.
+    """
+    with open(filepath, 'rb') as f:
+        return _compression_of(f.read(18))
+
+def _compression_of(head):
+    """detect_compression on the first 18 bytes of a stream."""
+    if head[:2] != GZIP_MAGIC:
+        return None
+    # BGZF is gzip with a 'BC' extra subfield (FLG.FEXTRA set) holding the block size
+    if len(head) >= 18 and head[3] & 4 and head[12:14] == b'BC':
+        return 'bgzf'
+    return 'gzip'
+
+def _read_bgzf_blocks(f):
+    """
+    Yields the raw bytes of successive BGZF blocks without decompressing them.
+    """
+    while True:
+        header = f.read(12)
+        if not header:
+            return
+        if len(header) < 12 or header[:2] != GZIP_MAGIC or not header[3] & 4:
+            raise ValueError("Invalid BGZF block header")
+        xlen = struct.unpack('<H', header[10:12])[0]
+        extra = f.read(xlen)
+        bsize = None
+        pos = 0
+        while pos + 4 <= len(extra):
+            slen = struct.unpack('<H', extra[pos + 2:pos + 4])[0]
+            if extra[pos:pos + 2] == b'BC' and slen == 2:
+                bsize = struct.unpack('<H', extra[pos + 4:pos + 6])[0]
+            pos += 4 + slen
+        if bsize is None:
+            raise ValueError("Gzip member without BGZF block size")
+        rest = f.read(bsize + 1 - 12 - xlen)
+        if len(rest) != bsize + 1 - 12 - xlen:
+            raise ValueError("Truncated BGZF block")
+        yield rest
+
+def _inflate_bgzf_blocks(blocks):
+    """
+    Decompresses a list of BGZF blocks (zlib releases the GIL, so this runs
+    in parallel across threads) and checks each block's CRC and size.
+    """
+    out = []
+    for rest in blocks:
+        cdata = rest[:-8]
+        crc, isize = struct.unpack('<II', rest[-8:])
+        data = zlib.decompress(cdata, -15)
+        if len(data) != isize or zlib.crc32(data) != crc:
+            raise ValueError("Corrupt BGZF block (CRC or size mismatch)")
+        out.append(data)
+    return b''.join(out)
+
+def _group_blocks(blocks, n):
+    group = []
+    for block in blocks:
+        group.append(block)
+        if len(group) >= n:
+            yield group
+            group = []
+    if group:
+        yield group
+
+class _ChunkReader(io.RawIOBase):
+    """Raw byte stream over an iterator of bytes chunks."""
+    def __init__(self, chunks, on_close=None):
+        self._chunks = chunks
+        self._buf = b''
+        self._pos = 0
+        self._on_close = on_close
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self._pos >= len(self._buf):
+            self._buf = next(self._chunks, None)
+            self._pos = 0
+            if self._buf is None:
+                self._buf = b''
+                return 0
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        super().close()
+
+def open_bgzf(filepath, threads=DEFAULT_DECOMPRESS_THREADS, fileobj=None):
+    """
+    Opens a BGZF file (or reads the binary stream fileobj, which is closed
+    with the returned stream) as a binary stream, inflating blocks ahead of
+    the reader in a thread pool while keeping block order.
+    """
+    f = open(filepath, 'rb') if fileobj is None else fileobj
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=threads)
+    groups = _group_blocks(_read_bgzf_blocks(f), BGZF_BLOCKS_PER_TASK)
+    chunks = bounded_map(executor, _inflate_bgzf_blocks, groups, max_inflight=2 * threads)
+
+    def close():
+        chunks.close()
+        executor.shutdown(wait=True)
+        f.close()
+
+    return io.BufferedReader(_ChunkReader(chunks, on_close=close), buffer_size=1 << 20)
+
+class _GzipStream(gzip.GzipFile):
+    """GzipFile over a binary stream that also closes the stream."""
+    def __init__(self, stream):
+        super().__init__(fileobj=stream, mode='rb')
+        self._stream = stream
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._stream.close()
+
+def _open_input(filepath):
+    """
+    Opens a FASTQ path once as a buffered binary stream and returns it
+    with its first bytes, for sniffing the compression. Regular files are
+    rewound after sniffing. Pipes (standard input, named pipes, process
+    substitution) cannot seek back, so their first bytes are put in front
+    of the rest of the stream instead. Closing the stream leaves stdin open.
+    """
+    raw = sys.stdin.buffer if filepath == STDIN else open(filepath, 'rb')
+    head = raw.read(18)
+    if filepath != STDIN and raw.seekable():
+        raw.seek(0)
+        return raw, head
+    read = getattr(raw, 'read1', raw.read)
+    chunks = itertools.chain([head], iter(lambda: read(1 << 16), b''))
+    on_close = None if filepath == STDIN else raw.close
+    return io.BufferedReader(_ChunkReader(chunks, on_close=on_close), buffer_size=1 << 20), head
+
+def open_fastq(filepath, threads=DEFAULT_DECOMPRESS_THREADS):
+    """
+    Opens a FASTQ file for text reading, transparently decompressing gzip
+    and (multi-threaded) BGZF input based on the file's magic bytes.
+    filepath '-' (STDIN) reads standard input. The path is opened once, so
+    named pipes work too.
+    """
+    stream, head = _open_input(filepath)
+    compression = _compression_of(head)
+    if compression == 'bgzf' and threads > 1:
+        return io.TextIOWrapper(open_bgzf(None, threads, fileobj=stream))
+    if compression is not None:
+        return io.TextIOWrapper(_GzipStream(stream))
+    return io.TextIOWrapper(stream)
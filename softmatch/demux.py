@@ -0,0 +1,117 @@
+import collections
+import gzip
+import hashlib
+import os
+import re
+
+# File name of reads without any hit
+UNMATCHED = 'unmatched'
+DEFAULT_MAX_OPEN = 64
+DEMUX_BUFFER_SIZE = 1024 * 1024
+DEMUX_GZIP_LEVEL = 1
+# Longer signature names (e.g. concatemers) are shortened and made unique with a hash
+MAX_NAME_LEN = 120
+_DIGEST_LEN = 12
+
+def signature_filename(signature):
+    """
+    File-safe name of a cluster_reads signature ((name, strand), ...),
+    e.g. 'adapter_1+__adapter_2-', or UNMATCHED for reads without hits.
+    Names that had to be sanitised or shortened, or whose query names
+    contain the '__' separator, get a hash of the signature appended so
+    that different signatures never share a file.
+    """
+    if not signature:
+        return UNMATCHED
+    raw = "__".join(f"{query}{'+' if strand == 1 else '-'}" for query, strand in signature)
+    name = re.sub(r'[^A-Za-z0-9._+-]', '_', raw)
+    if name != raw or len(name) > MAX_NAME_LEN or any('__' in query for query, _ in signature):
+        digest = hashlib.sha1(repr(tuple(signature)).encode()).hexdigest()[:_DIGEST_LEN]
+        name = f"{name[:MAX_NAME_LEN - _DIGEST_LEN - 1]}.{digest}"
+    return name
+
+def trim_span(read_len, hits):
+    """
+    Part of a read kept by --trim: the longest stretch not covered by any
+    of the (filtered, non-overlapping, start-sorted) hits, leftmost on ties.
+    That is the insert between two flanking adapters, or the longer side of
+    a single one. Returns (start, end).
+    """
+    best = (0, 0)
+    pos = 0
+    for hit in hits + [{'start': read_len, 'end': read_len}]:
+        if hit['start'] - pos > best[1] - best[0]:
+            best = (pos, hit['start'])
+        pos = max(pos, hit['end'])
+    return best
+
+class DemuxWriter:
+    """
+    Appends FASTQ blocks to one file per signature in a directory.
+    Blocks are buffered per file and written in chunks of about
+    buffer_size bytes; at most max_open files are open at once (least
+    recently written ones are closed and later reopened for appending).
+    With compress=True every chunk is written as one gzip member, which
+    gzip readers treat as a single stream.
+    write() takes {name: bytes}, so a BackgroundWriter can drive it.
+    """
+    def __init__(self, directory, max_open=DEFAULT_MAX_OPEN, compress=False, buffer_size=DEMUX_BUFFER_SIZE):
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_open = max_open
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self._buffers = {}
+        self._buffered = collections.Counter()
+        self._handles = collections.OrderedDict()
+        self._created = set()
+
+    def path(self, name):
+        return os.path.join(self.directory, name + (".fastq.gz" if self.compress else ".fastq"))
+
+    def write(self, blocks):
+        for name, data in blocks.items():
+            self._buffers.setdefault(name, []).append(data)
+            self._buffered[name] += len(data)
+            if self._buffered[name] >= self.buffer_size:
+                self._flush(name)
+
+    def _handle(self, name):
+        f = self._handles.get(name)
+        if f is not None:
+            self._handles.move_to_end(name)
+            return f
+        if len(self._handles) >= self.max_open:
+            self._handles.popitem(last=False)[1].close()
+        # The first open of a run truncates leftovers from earlier runs
+        f = open(self.path(name), 'ab' if name in self._created else 'wb')
+        self._created.add(name)
+        self._handles[name] = f
+        return f
+
+    def _flush(self, name):
+        data = b"".join(self._buffers.pop(name, ()))
+        self._buffered.pop(name, None)
+        if not data:
+            return
+        if self.compress:
+            data = gzip.compress(data, compresslevel=DEMUX_GZIP_LEVEL)
+        self._handle(name).write(data)
+
+    def files(self):
+        """Paths of all files written so far."""
+        return sorted(self.path(name) for name in self._created | set(self._buffers))
+
+    def close(self):
+        for name in list(self._buffers):
+            self._flush(name)
+        while self._handles:
+            self._handles.popitem()[1].close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,168 @@
+from .processing import _IUPAC_BASES, _scan_spans, reverse_complement
+
+try:
+    import numpy as np
+except ImportError: # optional dependency, only needed for the hamming engine
+    np = None
+
+# Read bases as bits; a query position matches a read base iff their codes share a bit
+_BASE_BITS = {'A': 1, 'C': 2, 'G': 4, 'T': 8, 'N': 16}
+# Bound on query x read x position cells compared at once
+MAX_CELLS = 1 << 22
+# Distance given to windows running past the end of a read
+_PAST_END = 1 << 30
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The hamming engine needs NumPy: pip install 'softmatch[numpy]'")
+
+def _read_lut():
+    lut = np.zeros(256, dtype=np.uint8)
+    for base, bit in _BASE_BITS.items():
+        lut[ord(base)] = bit
+    return lut
+
+def compile_hamming(seq):
+    """
+    Encodes a query as a uint8 array of IUPAC bitmasks (N also matches an
+    N in the read, as in the regex patterns).
+    """
+    _require_numpy()
+    codes = np.zeros(len(seq), dtype=np.uint8)
+    for i, base in enumerate(seq):
+        for b in _IUPAC_BASES.get(base, base):
+            codes[i] |= _BASE_BITS.get(b, 0)
+    return codes
+
+def compile_hamming_queries(queries):
+    """
+    Adds 'fwd_codes'/'rev_codes' bitmask arrays to each query; palindromic
+    queries get no reverse codes, as with the other engines.
+    """
+    for q in queries:
+        rev_seq = reverse_complement(q['seq'])
+        q['rev_seq'] = rev_seq
+        q['fwd_codes'] = compile_hamming(q['seq'])
+        q['rev_codes'] = compile_hamming(rev_seq) if rev_seq != q['seq'] else None
+    return queries
+
+def encode_reads(read_seqs):
+    """
+    Encodes reads as a zero-padded (reads x max length) uint8 matrix of base
+    bits. Returns (matrix, lengths).
+    """
+    _require_numpy()
+    lengths = np.array([len(seq) for seq in read_seqs], dtype=np.int64)
+    width = int(lengths.max()) if len(read_seqs) else 0
+    matrix = np.zeros((len(read_seqs), width), dtype=np.uint8)
+    flat = np.frombuffer(''.join(read_seqs).encode('ascii', 'replace'), dtype=np.uint8)
+    rows = np.repeat(np.arange(len(read_seqs)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    matrix[rows, np.arange(len(flat)) - starts] = _read_lut()[flat]
+    return matrix, lengths
+
+def _hamming_distances(matrix, lengths, codes):
+    """
+    Sliding Hamming distances of same-length queries against every read,
+    by broadcasting: codes is (queries x L), the result (queries x reads x
+    starts), with windows running past a read's end set to _PAST_END.
+    """
+    n_queries, m = codes.shape
+    n_starts = matrix.shape[1] - m + 1
+    matches = np.zeros((n_queries, matrix.shape[0], n_starts), dtype=np.int32)
+    for j in range(m):
+        matches += (matrix[None, :, j:j + n_starts] & codes[:, j, None, None]) != 0
+    distances = m - matches
+    distances[:, np.arange(n_starts)[None, :] > (lengths - m)[:, None]] = _PAST_END
+    return distances
+
+def _best_first(candidates, m, lo, hi):
+    """
+    Picks non-overlapping hits from (start, errors) candidates in [lo, hi)
+    like regex BESTMATCH finditer: the fewest errors in the rest of the
+    span (leftmost on ties), then resume after it.
+    """
+    pos = lo
+    picked = []
+    while True:
+        best = None
+        for start, errors in candidates:
+            if start >= pos and start + m <= hi and (best is None or errors < best[1]):
+                best = (start, errors)
+        if best is None:
+            return picked
+        picked.append(best)
+        pos = best[0] + m
+
+def find_hamming_batch(read_seqs, queries, max_errors, windows_list=None, presence=False):
+    """
+    Substitution-only matching of a batch of reads against all queries with
+    NumPy. windows_list optionally gives each read's candidate windows (see
+    find_matches). Returns, per read, the hits find_matches would return
+    with the regex engine limited to substitutions or, with presence=True,
+    find_presence bitmasks.
+    """
+    _require_numpy()
+    results = [0 if presence else [] for _ in read_seqs]
+    if not read_seqs or not queries:
+        return results
+    matrix, lengths = encode_reads(read_seqs)
+
+    # Group query strands by length so each group is one broadcast
+    groups = {}
+    for query_idx, q in enumerate(queries):
+        fwd = q.get('fwd_codes')
+        if fwd is None:
+            rev_seq = q.get('rev_seq') or reverse_complement(q['seq'])
+            fwd = compile_hamming(q['seq'])
+            rev = compile_hamming(rev_seq) if rev_seq != q['seq'] else None
+        else:
+            rev = q['rev_codes']
+        for strand, codes in ((1, fwd), (-1, rev)):
+            if codes is not None and 0 < len(codes) <= matrix.shape[1]:
+                groups.setdefault(len(codes), []).append((query_idx, strand, codes))
+
+    found = [[] for _ in read_seqs]
+    for m, strands in groups.items():
+        n_starts = matrix.shape[1] - m + 1
+        chunk = max(1, MAX_CELLS // (len(read_seqs) * n_starts))
+        for c in range(0, len(strands), chunk):
+            part = strands[c:c + chunk]
+            distances = _hamming_distances(matrix, lengths, np.stack([codes for _, _, codes in part]))
+            for g, read_idx, start in zip(*np.nonzero(distances <= max_errors)):
+                query_idx, strand, _ = part[g]
+                found[read_idx].append((query_idx, strand, m, int(start), int(distances[g, read_idx, start])))
+
+    for read_idx, hits in enumerate(found):
+        if not hits:
+            continue
+        windows = windows_list[read_idx] if windows_list is not None else None
+        read_seq = read_seqs[read_idx]
+        by_strand = {}
+        for query_idx, strand, m, start, errors in hits:
+            by_strand.setdefault((query_idx, strand, m), []).append((start, errors))
+        if presence:
+            mask = 0
+            for (query_idx, strand, m), candidates in by_strand.items():
+                for lo, hi in _scan_spans(windows, query_idx, strand, len(read_seq)):
+                    if any(lo <= start and start + m <= hi for start, _ in candidates):
+                        mask |= 1 << (2 * query_idx + (strand == -1))
+                        break
+            results[read_idx] = mask
+            continue
+        picked = []
+        for (query_idx, strand, m), candidates in by_strand.items():
+            for lo, hi in _scan_spans(windows, query_idx, strand, len(read_seq)):
+                for start, errors in _best_first(candidates, m, lo, hi):
+                    picked.append((start, query_idx, strand == -1, m, errors))
+        picked.sort()
+        results[read_idx] = [{
+            'name': queries[query_idx]['name'],
+            'start': start,
+            'end': start + m,
+            'len': m,
+            'errors': errors,
+            'match_seq': read_seq[start:start + m],
+            'strand': -1 if rev else 1
+        } for start, query_idx, rev, m, errors in picked]
+    return results
@@ -0,0 +1,243 @@
+import bisect
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError: # optional; HitTable then returns array.array columns
+    np = None
+
+# Columnar hit table (--format columnar): a header with the query and input
+# file names, then one self-contained chunk per batch. All integers are
+# little-endian and every column starts 8-byte aligned within the file, so
+# columns can be used in place from a memory map.
+HIT_TABLE_MAGIC = b'SMHITS\x00\x01'
+_CHUNK_MAGIC = b'SMCK'
+# magic, file index, reads, hits, bytes of read IDs
+_CHUNK_HEADER = struct.Struct('<4sIIIQ')
+# (name, typecode) of the per-hit columns in chunk order, after the read-ID offsets
+HIT_TABLE_COLUMNS = (('read', 'I'), ('query', 'I'), ('start', 'I'), ('end', 'I'), ('errors', 'H'), ('strand', 'b'))
+_NP_DTYPES = {'Q': '<u8', 'I': '<u4', 'H': '<u2', 'b': 'i1'}
+
+class HitColumns:
+    """
+    Compact store for the reads of a batch and their hits.
+    Hits are kept as parallel typed arrays (read index, query index, start,
+    end, strand, errors) instead of one dict per hit, so they are cheap to
+    allocate and to pickle between processes. match_seq is not stored; it
+    is sliced back out of the read when hits are expanded.
+    Iterating yields (read_id, seq, hits) with hits as the usual hit dicts,
+    which is what filter_hits, generate_html and the TSV writer consume.
+
+    With store_seqs=False only the read lengths and the matched sequences are
+    kept, for reads that are only sampled or reported piecewise (summary
+    samples, long-read windows); seq is then None when iterating.
+    """
+    def __init__(self, names, store_seqs=True):
+        self.names = list(names)
+        self._name_idx = {name: i for i, name in enumerate(self.names)}
+        self.store_seqs = store_seqs
+        self.read_ids = []
+        self.seqs = []
+        self.seq_lens = array('I')
+        self.match_seqs = []
+        self.read = array('I')
+        self.query = array('I')
+        self.start = array('I')
+        self.end = array('I')
+        self.strand = array('b')
+        self.errors = array('H')
+
+    def add(self, read_id, seq, hits, seq_len=None):
+        """
+        Appends one read and its list of hit dicts. Without store_seqs, seq may
+        be None if seq_len is given.
+        """
+        read_idx = len(self.read_ids)
+        self.read_ids.append(read_id)
+        if self.store_seqs:
+            self.seqs.append(seq)
+        else:
+            self.seq_lens.append(len(seq) if seq_len is None else seq_len)
+            self.match_seqs.extend(hit['match_seq'] for hit in hits)
+        for hit in hits:
+            self.read.append(read_idx)
+            self.query.append(self._name_idx[hit['name']])
+            self.start.append(hit['start'])
+            self.end.append(hit['end'])
+            self.strand.append(hit['strand'])
+            self.errors.append(hit['errors'])
+
+    def __len__(self):
+        return len(self.read_ids)
+
+    def n_hits(self):
+        return len(self.read)
+
+    def seq_len(self, read_idx):
+        if self.store_seqs:
+            return len(self.seqs[read_idx])
+        return self.seq_lens[read_idx]
+
+    def hits(self, read_idx):
+        """Expands the hits of one read into hit dicts."""
+        seq = self.seqs[read_idx] if self.store_seqs else None
+        # Hits are appended read by read, so the read column is sorted
+        lo = bisect.bisect_left(self.read, read_idx)
+        hi = bisect.bisect_right(self.read, read_idx, lo)
+        hits = []
+        for i in range(lo, hi):
+            start, end = self.start[i], self.end[i]
+            hits.append({
+                'name': self.names[self.query[i]],
+                'start': start,
+                'end': end,
+                'len': end - start,
+                'errors': self.errors[i],
+                'match_seq': seq[start:end] if seq is not None else self.match_seqs[i],
+                'strand': self.strand[i]
+            })
+        return hits
+
+    def __iter__(self):
+        for read_idx, read_id in enumerate(self.read_ids):
+            seq = self.seqs[read_idx] if self.store_seqs else None
+            yield read_id, seq, self.hits(read_idx)
+
+def _pad8(n):
+    return -n % 8
+
+def hit_table_header(query_names, files=()):
+    """File header of a hit table: magic, metadata length and JSON metadata."""
+    meta = json.dumps({'queries': list(query_names), 'files': list(files)}).encode()
+    meta += b' ' * _pad8(len(meta))
+    return HIT_TABLE_MAGIC + struct.pack('<Q', len(meta)) + meta
+
+def encode_chunk(columns, file_idx=0):
+    """
+    Encodes a HitColumns as one hit table chunk: the header, read-ID byte
+    offsets (uint64, one more than reads), the hit columns of
+    HIT_TABLE_COLUMNS and the UTF-8 read IDs, padded to 8 bytes. Read
+    indices are local to the chunk. Returns b'' for a batch without hits.
+    """
+    if not columns.n_hits():
+        return b''
+    ids = [read_id.encode() for read_id in columns.read_ids]
+    offsets = array('Q', [0])
+    for read_id in ids:
+        offsets.append(offsets[-1] + len(read_id))
+    parts = [offsets] + [getattr(columns, name) for name, _ in HIT_TABLE_COLUMNS]
+    if sys.byteorder == 'big':
+        parts = [array(part.typecode, part) for part in parts]
+        for part in parts:
+            part.byteswap()
+    body = [part.tobytes() for part in parts]
+    body.append(b''.join(ids))
+    size = sum(len(b) for b in body)
+    body.append(b'\x00' * _pad8(size))
+    header = _CHUNK_HEADER.pack(_CHUNK_MAGIC, file_idx, len(ids), columns.n_hits(), offsets[-1])
+    return header + b''.join(body)
+
+def set_chunk_file(chunk, file_idx):
+    """Returns chunk with its input file index replaced."""
+    if not chunk:
+        return chunk
+    return chunk[:4] + struct.pack('<I', file_idx) + chunk[8:]
+
+class HitTable:
+    """
+    Reader for hit tables written with --format columnar. The file is
+    memory-mapped; with NumPy the columns of each chunk are zero-copy
+    arrays over the map, otherwise array.array copies.
+        table = HitTable("results.hits")
+        cols = table.columns()  # e.g. pandas.DataFrame(cols)
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if mm[:8] != HIT_TABLE_MAGIC:
+            raise ValueError(f"{path} is not a softmatch hit table")
+        meta_len, = struct.unpack_from('<Q', mm, 8)
+        meta = json.loads(mm[16:16 + meta_len].decode())
+        self.query_names = meta['queries']
+        self.files = meta['files']
+        # (offset, file index, reads, hits, read-ID bytes) per chunk
+        self._chunks = []
+        pos = 16 + meta_len
+        while pos < len(mm):
+            magic, file_idx, n_reads, n_hits, ids_len = _CHUNK_HEADER.unpack_from(mm, pos)
+            if magic != _CHUNK_MAGIC:
+                raise ValueError(f"{path}: corrupt chunk at byte {pos}")
+            self._chunks.append((pos, file_idx, n_reads, n_hits, ids_len))
+            size = _CHUNK_HEADER.size + 8 * (n_reads + 1) + ids_len
+            size += n_hits * sum(array(code).itemsize for _, code in HIT_TABLE_COLUMNS)
+            pos += size + _pad8(size)
+        self.n_reads = sum(chunk[2] for chunk in self._chunks)
+        self.n_hits = sum(chunk[3] for chunk in self._chunks)
+
+    def __len__(self):
+        return self.n_hits
+
+    def _column(self, typecode, offset, count):
+        if np is not None:
+            return np.frombuffer(self._mm, dtype=_NP_DTYPES[typecode], count=count, offset=offset)
+        column = array(typecode)
+        column.frombytes(self._mm[offset:offset + count * column.itemsize])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        return column
+
+    def chunks(self):
+        """
+        Yields one dict per chunk: 'file' (input file index), 'read_ids'
+        (list of str) and the HIT_TABLE_COLUMNS, with 'read' indexing
+        read_ids.
+        """
+        for offset, file_idx, n_reads, n_hits, ids_len in self._chunks:
+            pos = offset + _CHUNK_HEADER.size
+            offsets = self._column('Q', pos, n_reads + 1)
+            pos += 8 * (n_reads + 1)
+            chunk = {'file': file_idx}
+            for name, code in HIT_TABLE_COLUMNS:
+                chunk[name] = self._column(code, pos, n_hits)
+                pos += n_hits * array(code).itemsize
+            ids = self._mm[pos:pos + ids_len]
+            chunk['read_ids'] = [ids[int(offsets[i]):int(offsets[i + 1])].decode() for i in range(n_reads)]
+            yield chunk
+
+    def read_ids(self):
+        """IDs of all reads with hits, in table order (the 'read' column of columns())."""
+        return [read_id for chunk in self.chunks() for read_id in chunk['read_ids']]
+
+    def columns(self):
+        """
+        All hits as one dict of columns: 'file' plus HIT_TABLE_COLUMNS,
+        with 'read' indexing read_ids(). NumPy arrays if available.
+        """
+        codes = dict(HIT_TABLE_COLUMNS, file='H')
+        parts = {name: [] for name in codes}
+        first_read = 0
+        for chunk in self.chunks():
+            n_hits = len(chunk['read'])
+            if np is not None:
+                parts['file'].append(np.full(n_hits, chunk['file'], dtype=_NP_DTYPES['H']))
+                parts['read'].append(chunk.pop('read') + np.uint32(first_read))
+            else:
+                parts['file'].append(array('H', [chunk['file']]) * n_hits)
+                parts['read'].append(array('I', (i + first_read for i in chunk.pop('read'))))
+            for name, _ in HIT_TABLE_COLUMNS[1:]:
+                parts[name].append(chunk[name])
+            first_read += len(chunk['read_ids'])
+        if np is not None:
+            return {name: np.concatenate(cols) if cols else np.zeros(0, dtype=_NP_DTYPES[codes[name]])
+                    for name, cols in parts.items()}
+        merged = {}
+        for name, cols in parts.items():
+            merged[name] = array(codes[name])
+            for column in cols:
+                merged[name].extend(column)
+        return merged
@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.idx'
+STRANDS = {'+': 1, '-': -1}
+
+def index_path(tsv_path):
+    """Sidecar index of a TSV, e.g. softmatch_results.txt.idx."""
+    return str(tsv_path) + INDEX_SUFFIX
+
+class IndexWriter:
+    """
+    Builds the sidecar index of a results TSV while it is written: read ID
+    -> byte offset and row count of its rows, plus posting lists of hit
+    rows per (query, strand, errors). write() takes (base, reads, hits)
+    from a worker batch, with offsets relative to the batch's block and
+    base the block's offset in the TSV, so a BackgroundWriter can drive it.
+    The SQLite file is built under a temporary name, indexed in close()
+    and only then moved into place.
+    """
+    def __init__(self, path, query_names):
+        self.path = path
+        self._tmp_path = path + '.tmp'
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+        # Written from a BackgroundWriter thread, closed from the main thread
+        self._db = sqlite3.connect(self._tmp_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE reads (id TEXT, offset INTEGER, n_rows INTEGER)")
+        self._db.execute("CREATE TABLE hits (query INTEGER, strand INTEGER, errors INTEGER, offset INTEGER)")
+        self._db.executemany("INSERT INTO meta VALUES (?, ?)",
+                             [('version', str(INDEX_VERSION)), ('queries', json.dumps(list(query_names)))])
+
+    def write(self, entries):
+        base, reads, hits = entries
+        self._db.executemany("INSERT INTO reads VALUES (?, ?, ?)",
+                             ((read_id, base + offset, n_rows) for read_id, offset, n_rows in reads))
+        self._db.executemany("INSERT INTO hits VALUES (?, ?, ?, ?)",
+                             ((query, strand, errors, base + offset) for query, strand, errors, offset in hits))
+
+    def close(self, tsv_size=None):
+        """
+        Finishes the index for a TSV of tsv_size bytes; without tsv_size
+        (e.g. the run failed) the partial index is discarded.
+        """
+        if self._db is None:
+            return
+        db, self._db = self._db, None
+        if tsv_size is None:
+            db.close()
+            os.remove(self._tmp_path)
+            return
+        db.execute("INSERT INTO meta VALUES ('tsv_size', ?)", (str(tsv_size),))
+        db.execute("CREATE INDEX reads_by_id ON reads (id)")
+        db.execute("CREATE INDEX hits_by_query ON hits (query, strand, errors, offset)")
+        db.commit()
+        db.close()
+        os.replace(self._tmp_path, self.path)
+
+class ResultIndex:
+    """
+    Answers lookups on a results TSV through its sidecar index without
+    scanning it: rows of given read IDs, or hit rows of a query filtered by
+    strand and errors, read by seeking to their byte offsets.
+    """
+    def __init__(self, tsv_path, path=None):
+        self.tsv_path = tsv_path
+        self.path = path or index_path(tsv_path)
+        if not os.path.exists(self.path):
+            raise ValueError(f"No index at {self.path}; rerun softmatch with --index")
+        self._db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if meta.get('version') != str(INDEX_VERSION):
+            raise ValueError(f"{self.path} is not a softmatch index (version {INDEX_VERSION})")
+        if int(meta['tsv_size']) != os.path.getsize(tsv_path):
+            raise ValueError(f"{self.path} does not match {tsv_path} (file changed since indexing)")
+        self.query_names = json.loads(meta['queries'])
+        self._tsv = open(tsv_path, 'rb')
+        with open(tsv_path, 'rb') as f:
+            self.header = f.readline().decode()
+
+    def _rows(self, offset, n_rows=1):
+        self._tsv.seek(offset)
+        return [self._tsv.readline().decode() for _ in range(n_rows)]
+
+    def lookup(self, read_id):
+        """TSV rows of a read ID (all of them if it occurs in several inputs)."""
+        rows = []
+        for offset, n_rows in self._db.execute("SELECT offset, n_rows FROM reads WHERE id = ? ORDER BY offset",
+                                               (read_id,)):
+            rows.extend(self._rows(offset, n_rows))
+        return rows
+
+    def _hit_filter(self, query, strand=None, max_errors=None):
+        """WHERE clause and parameters selecting hit postings."""
+        if query not in self.query_names:
+            raise ValueError(f"Unknown query '{query}'")
+        sql = "WHERE query = ?"
+        params = [self.query_names.index(query)]
+        if strand is not None:
+            sql += " AND strand = ?"
+            params.append(strand)
+        if max_errors is not None:
+            sql += " AND errors <= ?"
+            params.append(max_errors)
+        return sql, params
+
+    def count(self, query, strand=None, max_errors=None):
+        """Number of rows the filter selects, from the index alone."""
+        where, params = self._hit_filter(query, strand, max_errors)
+        return self._db.execute(f"SELECT COUNT(DISTINCT offset) FROM hits {where}", params).fetchone()[0]
+
+    def filter(self, query, strand=None, max_errors=None, limit=None):
+        """
+        Yields the TSV rows with a hit of query (strand 1/-1, at most
+        max_errors errors), in file order. Presence-mode rows record no
+        errors, so max_errors filters out all of them.
+        """
+        where, params = self._hit_filter(query, strand, max_errors)
+        sql = f"SELECT DISTINCT offset FROM hits {where} ORDER BY offset"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for offset, in self._db.execute(sql, params).fetchall():
+            yield self._rows(offset)[0]
+
+    def close(self):
+        self._db.close()
+        self._tsv.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,109 @@
+import collections
+import concurrent.futures
+import queue
+import threading
+
+def bounded_map(executor, fn, iterable, max_inflight, ordered=True):
+    """
+    Like executor.map, but pulls from iterable lazily and keeps at most
+    max_inflight tasks submitted at any time, so a slow consumer (or a huge
+    input) cannot queue up the whole input as pending futures.
+    With ordered=True results are yielded in input order, otherwise as
+    soon as they complete.
+    """
+    if max_inflight < 1:
+        raise ValueError("max_inflight must be at least 1")
+    items = iter(iterable)
+    pending = collections.deque()
+
+    def submit_next():
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            return True
+        return False
+
+    try:
+        while len(pending) < max_inflight and submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                future = next(f for f in pending if f in done)
+                pending.remove(future)
+            result = future.result()
+            submit_next()
+            yield result
+    finally:
+        for future in pending:
+            future.cancel()
+
+class BackgroundWriter:
+    """
+    Writes byte blocks to a binary file object from a dedicated thread, so
+    the caller only hands over ready-made blocks. At most max_queued blocks
+    wait in the queue; write() blocks beyond that (backpressure).
+    Errors raised in the writer thread are re-raised by write() or close().
+    With flush=True the file is flushed after every block, so a reader at
+    the other end of a pipe sees each batch as soon as it is written.
+    """
+    def __init__(self, f, max_queued=16, flush=False):
+        self._f = f
+        self._flush = flush
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            block = self._queue.get()
+            if block is None:
+                return
+            if isinstance(block, threading.Event):
+                # flush() barrier: everything queued before it has been written
+                if self._error is None:
+                    try:
+                        self._f.flush()
+                    except BaseException as e:
+                        self._error = e
+                block.set()
+                continue
+            if self._error is None:
+                try:
+                    self._f.write(block)
+                    if self._flush:
+                        self._f.flush()
+                except BaseException as e:
+                    self._error = e
+
+    def write(self, block):
+        if self._error is not None:
+            raise self._error
+        if block:
+            self._queue.put(block)
+
+    def flush(self):
+        """Blocks until every block written so far is written and flushed."""
+        if self._error is not None:
+            raise self._error
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
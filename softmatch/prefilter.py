@@ -0,0 +1,151 @@
+import collections
+import itertools
+from .processing import reverse_complement, _IUPAC_BASES
+
+MIN_SEED_LEN = 4
+MAX_SEED_VARIANTS = 64
+
+def _expand_seed(seed):
+    """
+    Expands IUPAC bases in a seed into all concrete k-mers it stands for.
+    Returns None if that would produce more than MAX_SEED_VARIANTS k-mers.
+    """
+    options = [_IUPAC_BASES.get(base, base) for base in seed]
+    n_variants = 1
+    for opt in options:
+        n_variants *= len(opt)
+    if n_variants > MAX_SEED_VARIANTS:
+        return None
+    return [''.join(p) for p in itertools.product(*options)]
+
+def build_seed_index(queries, max_errors):
+    """
+    Builds a pigeonhole seed index over all queries on both strands.
+
+    A match with at most k errors leaves at least one of k+1 disjoint
+    pieces of the query intact, so every hit contains one of these seeds
+    exactly. Returns a dict:
+        'seeds': {seed_len: {kmer: [(query_idx, strand, offset, query_len), ...]}},
+        'always': [(query_idx, strand, query_len), ...] for query strands
+                  too short or too ambiguous to seed (always verified),
+        'max_errors': k,
+        'automaton': Aho-Corasick automaton over all seeds (see _build_automaton)
+    """
+    n_pieces = max_errors + 1
+    strands = []
+    for query_idx, q in enumerate(queries):
+        rev_seq = q.get('rev_seq') or reverse_complement(q['seq'])
+        strands.append((query_idx, 1, q['seq']))
+        if rev_seq != q['seq']:
+            strands.append((query_idx, -1, rev_seq))
+
+    seeds = {}
+    always = []
+    for query_idx, strand, seq in strands:
+        m = len(seq)
+        piece_len = m // n_pieces
+        entries = []
+        if piece_len >= MIN_SEED_LEN:
+            for i in range(n_pieces):
+                offset = i * piece_len
+                kmers = _expand_seed(seq[offset:offset + piece_len])
+                if kmers is None:
+                    entries = None
+                    break
+                entries.extend((kmer, offset) for kmer in kmers)
+        else:
+            entries = None
+
+        if entries is None:
+            always.append((query_idx, strand, m))
+            continue
+        by_kmer = seeds.setdefault(piece_len, {})
+        for kmer, offset in entries:
+            by_kmer.setdefault(kmer, []).append((query_idx, strand, offset, m))
+
+    return {'seeds': seeds, 'always': always, 'max_errors': max_errors,
+            'automaton': _build_automaton(seeds)}
+
+def _build_automaton(seeds):
+    """
+    Builds an Aho-Corasick automaton over the seed k-mers of every length,
+    so find_candidates walks each read once whatever the number of queries.
+    Returns {'delta': [{char: next_state}], 'out': [((seed_len, entries), ...)]}:
+    delta is the full transition table (missing chars go to the root) and
+    out[state] lists every seed ending in that state, including seeds that
+    are suffixes of longer ones.
+    """
+    goto = [{}]
+    out = [[]]
+    for seed_len, by_kmer in seeds.items():
+        for kmer, entries in by_kmer.items():
+            state = 0
+            for char in kmer:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = goto[state][char] = len(goto)
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append((seed_len, entries))
+
+    alphabet = set()
+    for by_kmer in seeds.values():
+        for kmer in by_kmer:
+            alphabet.update(kmer)
+    # Breadth-first, so a state's failure target (shallower) is complete first
+    delta = [dict(goto[0])] + [{} for _ in range(len(goto) - 1)]
+    fail = [0] * len(goto)
+    queue = collections.deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        out[state].extend(out[fail[state]])
+        for char in alphabet:
+            nxt = goto[state].get(char)
+            if nxt is not None:
+                fail[nxt] = delta[fail[state]].get(char, 0)
+                delta[state][char] = nxt
+                queue.append(nxt)
+            else:
+                target = delta[fail[state]].get(char, 0)
+                if target:
+                    delta[state][char] = target
+    return {'delta': delta, 'out': [tuple(o) for o in out]}
+
+def find_candidates(index, read_seq):
+    """
+    Scans a read once for exact seed hits of all queries with the seed
+    automaton.
+    Returns {(query_idx, strand): [(lo, hi)]}, one span per query strand
+    from its first to its last seed window; an empty dict means no query
+    can match the read. Every match with at most k errors lies in a seed
+    window, so scanning the single span finds what a whole-read scan does,
+    including BESTMATCH passing over a worse hit before a better one
+    (separate windows would each report their own best).
+    """
+    k = index['max_errors']
+    n = len(read_seq)
+
+    delta = index['automaton']['delta']
+    out = index['automaton']['out']
+    spans = {}
+    state = 0
+    for i, char in enumerate(read_seq):
+        state = delta[state].get(char, 0)
+        if not out[state]:
+            continue
+        for seed_len, entries in out[state]:
+            for query_idx, strand, offset, m in entries:
+                start = i - seed_len + 1 - offset
+                lo, hi = max(0, start - k), min(n, start + m + k)
+                span = spans.get((query_idx, strand))
+                if span is None:
+                    spans[(query_idx, strand)] = [lo, hi]
+                else:
+                    span[0] = min(span[0], lo)
+                    span[1] = max(span[1], hi)
+
+    for query_idx, strand, m in index['always']:
+        spans[(query_idx, strand)] = [0, n]
+
+    return {key: [tuple(span)] for key, span in spans.items()}
@@ -1,12 +1,18 @@
+import bisect
 import csv
+import itertools
+import mmap
+import os
 import regex
+from .compression import open_fastq, DEFAULT_DECOMPRESS_THREADS
 
-def parse_fastq(filepath):
+def parse_fastq(filepath, threads=DEFAULT_DECOMPRESS_THREADS):
     """
     Generator that streams FASTQ records to save memory.
+    Gzip and BGZF input is decompressed on the fly (BGZF with threads).
     Yields (header, sequence, qual).
     """
-    with open(filepath, 'r') as f:
+    with open_fastq(filepath, threads) as f:
         while True:
             header = f.readline().strip()
             if not header: break
@@ -15,10 +21,109 @@ def parse_fastq(filepath):
             qual = f.readline().strip()
             yield header, seq, qual
 
+def pair_id(header):
+    """Read ID shared by both mates: the first header word without /1 or /2."""
+    read_id = header.split()[0]
+    if read_id.endswith(('/1', '/2')):
+        read_id = read_id[:-2]
+    return read_id
+
+def parse_fastq_pairs(r1_path, r2_path, threads=DEFAULT_DECOMPRESS_THREADS):
+    """
+    Streams two mate FASTQ files in lockstep.
+    Yields (r1_header, r1_seq, r2_seq); raises ValueError if the read IDs
+    (ignoring /1 and /2 suffixes) or the record counts disagree.
+    """
+    r1 = parse_fastq(r1_path, threads)
+    r2 = parse_fastq(r2_path, threads)
+    for rec1, rec2 in itertools.zip_longest(r1, r2):
+        if rec1 is None or rec2 is None:
+            raise ValueError(f"{r1_path if rec1 is None else r2_path} has fewer reads than its mate file")
+        if pair_id(rec1[0]) != pair_id(rec2[0]):
+            raise ValueError(f"Mates out of sync: '{rec1[0]}' in {r1_path} vs '{rec2[0]}' in {r2_path}")
+        yield rec1[0], rec1[1], rec2[1]
+
+def _next_record_start(mm, pos):
+    """
+    Offset of the first FASTQ record at or after pos in a mapped file.
+    A line starting with '@' may also be a quality line, so a header is only
+    accepted if the line after its sequence starts with '+'.
+    """
+    n = len(mm)
+    if pos <= 0:
+        return 0
+    while pos < n:
+        nl = mm.find(b'\n', pos - 1)
+        if nl < 0 or nl + 1 >= n:
+            return n
+        line = nl + 1
+        if mm[line:line + 1] == b'@':
+            header_end = mm.find(b'\n', line)
+            seq_end = mm.find(b'\n', header_end + 1) if header_end >= 0 else -1
+            if seq_end >= 0 and mm[seq_end + 1:seq_end + 2] == b'+':
+                return line
+        pos = line + 1
+    return n
+
+def fastq_shards(filepath, shard_bytes):
+    """
+    Splits an uncompressed FASTQ file into record-aligned byte ranges of
+    roughly shard_bytes each. Only the shard boundaries are scanned.
+    Returns a list of (start, end) offsets.
+    """
+    size = os.path.getsize(filepath)
+    if size == 0:
+        return []
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = [0]
+        while bounds[-1] < size:
+            bounds.append(_next_record_start(mm, bounds[-1] + shard_bytes))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def parse_fastq_range(filepath, start, end, with_offsets=False):
+    """
+    Like parse_fastq, but parses only the records in the byte range
+    [start, end) of an uncompressed file, reading through mmap.
+    Yields (header, sequence, qual), with with_offsets plus the byte
+    offset just past the record.
+    """
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        n = len(mm)
+        pos = start
+        while pos < end:
+            lines = []
+            for _ in range(4):
+                nl = mm.find(b'\n', pos)
+                if nl < 0:
+                    nl = n
+                lines.append(mm[pos:nl].strip().decode())
+                pos = nl + 1
+            header, seq, _, qual = lines
+            if not header: break
+            if with_offsets:
+                yield header, seq, qual, min(pos, n)
+            else:
+                yield header, seq, qual
+
+def _parse_window(value, query_name, column):
+    """
+    Optional search window column: a base count, or None if empty. Raises
+    ValueError naming the query and column for anything else.
+    """
+    value = value.strip()
+    if not value:
+        return None
+    if not value.isdigit():
+        raise ValueError(f"Query '{query_name}': {column} must be a base count, got '{value}'")
+    return int(value)
+
 def parse_queries(filepath):
     """
-    Parses CSV: Name,Sequence or just Sequence.
-    Returns list of dicts: {'name': str, 'seq': str}
+    Parses CSV: Name,Sequence[,Search5p,Search3p] or just Sequence.
+    The optional window columns restrict the search for that query to the
+    first/last N bases of each read (see anchored_windows).
+    Returns list of dicts: {'name': str, 'seq': str[, 'search_5p': int, 'search_3p': int]}
+    Raises ValueError for a window column that is not a base count.
     """
     queries = []
     with open(filepath, 'r') as f:
@@ -34,7 +139,12 @@ def parse_queries(filepath):
         for row in reader:
             if not row: continue
             if len(row) >= 2:
-                queries.append({'name': row[0].strip(), 'seq': row[1].strip().upper()})
+                q = {'name': row[0].strip(), 'seq': row[1].strip().upper()}
+                if len(row) >= 3:
+                    q['search_5p'] = _parse_window(row[2], q['name'], 'Search5p')
+                if len(row) >= 4:
+                    q['search_3p'] = _parse_window(row[3], q['name'], 'Search3p')
+                queries.append(q)
             elif len(row) == 1:
                 # Assign generic name if missing
                 queries.append({'name': f"Adapter_{idx}", 'seq': row[0].strip().upper()})
@@ -64,13 +174,401 @@ def expand_ambiguous(seq):
         pattern += IUPAC_REGEX.get(base, base)
     return pattern
 
-def find_matches(read_seq, queries, max_errors):
+_IUPAC_BASES = {base: cls.strip('[]') for base, cls in IUPAC_REGEX.items()}
+
+ENGINES = ('regex', 'myers')
+# Substitutions, insertions, deletions, as in regex fuzzy constraints
+ERROR_TYPES = ('s', 'i', 'd')
+MISMATCHES_ONLY = {'i': 0, 'd': 0}
+
+def parse_error_types(spec):
+    """
+    Parses per-error-type limits such as 's<=2,i<=0,d<=1'.
+    Returns {'s': int, 'i': int, 'd': int} for the types given.
+    """
+    limits = {}
+    for part in spec.split(','):
+        m = regex.fullmatch(r"\s*([sid])\s*<=\s*(\d+)\s*", part)
+        if m is None:
+            raise ValueError(f"Invalid error limit '{part.strip()}' (expected e.g. s<=2, i<=0 or d<=1)")
+        limits[m.group(1)] = int(m.group(2))
+    return limits
+
+def fuzzy_constraints(max_errors, error_types=None):
+    """
+    Body of a regex fuzzy constraint: at most max_errors errors in total,
+    plus optional per-type limits. regex forbids the types a constraint
+    leaves out once any is listed, so all three are spelled out.
+    """
+    if not error_types:
+        return f"e<={max_errors}"
+    limits = ",".join(f"{t}<={error_types.get(t, max_errors)}" for t in ERROR_TYPES)
+    return f"e<={max_errors},{limits}"
+
+# Joins reads in find_matches_batch; screen patterns may not match or
+# substitute it, so no match can span two reads
+BATCH_SEPARATOR = '\n'
+
+def compile_myers(seq):
+    """
+    Precomputes the per-symbol match masks used by the bit-vector kernel.
+    Masks are indexed by byte value, IUPAC bases set the bit for every
+    base they stand for (mirroring expand_ambiguous).
+    """
+    peq = [0] * 256
+    peq_rev = [0] * 256
+    m = len(seq)
+    for i, base in enumerate(seq):
+        for b in _IUPAC_BASES.get(base, base):
+            peq[ord(b)] |= 1 << i
+            peq_rev[ord(b)] |= 1 << (m - 1 - i)
+    return {'peq': peq, 'peq_rev': peq_rev, 'len': m}
+
+def _myers_best_start(peq_rev, m, text, pos, endpos, max_errors):
+    """
+    Myers/Hyyro bit-vector scan of text[pos:endpos] from right to left with the
+    reversed pattern. Returns (errors, start) for the leftmost start of a
+    best-scoring alignment, or (None, -1) if none has at most max_errors edits.
+    """
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    best = max_errors + 1
+    best_start = -1
+    for j in range(endpos - 1, pos - 1, -1):
+        eq = peq_rev[text[j]]
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score <= best and score <= max_errors:
+            best = score
+            best_start = j
+    if best_start < 0:
+        return None, -1
+    return best, best_start
+
+def _myers_end(peq, m, text, start, endpos, errors):
+    """
+    Anchored forward scan from start to recover the match end.
+    Among alignments reaching the given error count, picks the one whose
+    length is closest to the query (longer on ties). regex picks among
+    such ties by its backtracking order instead, so with two or more
+    errors the end can differ from the regex engine's, and with it where
+    myers_finditer resumes.
+    """
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    end = start
+    for j in range(start, min(endpos, start + m + errors)):
+        eq = peq[text[j]]
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score == errors and abs(j + 1 - start - m) <= abs(end - start - m):
+            end = j + 1
+    return end
+
+def myers_finditer(pattern, text, max_errors, pos=0, endpos=None):
+    """
+    Yields (start, end, errors) for a compiled Myers pattern over a
+    byte-encoded read, following regex BESTMATCH finditer semantics:
+    take the best match in the rest of the read (leftmost start), then
+    resume at its end. The end is chosen by _myers_end; where it differs
+    from regex's, later matches can differ too.
+    """
+    m = pattern['len']
+    if m == 0:
+        return
+    n = len(text) if endpos is None else min(endpos, len(text))
+    while pos < n:
+        errors, start = _myers_best_start(pattern['peq_rev'], m, text, pos, n, max_errors)
+        if start < 0:
+            return
+        end = _myers_end(pattern['peq'], m, text, start, n, errors)
+        if end == start:
+            return
+        yield start, end, errors
+        pos = end
+
+def myers_search(pattern, text, max_errors, pos=0, endpos=None):
+    """
+    Returns True as soon as any alignment of the pattern with at most
+    max_errors edits ends in text[pos:endpos], without locating it.
+    """
+    m = pattern['len']
+    if m == 0:
+        return False
+    peq = pattern['peq']
+    n = len(text) if endpos is None else min(endpos, len(text))
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    for j in range(pos, n):
+        eq = peq[text[j]]
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+            if score <= max_errors:
+                return True
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return False
+
+def _compile_screen(seq, max_errors):
+    # Errors may not use the separator, so matches stay inside one read. The
+    # screen ignores per-type limits; it may only pass extra reads to verify
+    return regex.compile(f"({expand_ambiguous(seq)}){{e<={max_errors}:[^{BATCH_SEPARATOR}]}}")
+
+def compile_queries(queries, max_errors, engine='regex', bestmatch=True, error_types=None, screens=False):
+    """
+    Pre-compiles forward and reverse patterns for the selected engine.
+    Palindromic queries get no reverse pattern to avoid duplicate hits.
+    error_types ({'s': n, 'i': n, 'd': n}, see parse_error_types) limits
+    each error type in regex patterns; the Myers engine only counts edits.
+    With bestmatch=False regex patterns stop at the first acceptable match,
+    which is all find_presence needs. With screens, regex queries also get
+    the first-match screen patterns of find_matches_batch (which otherwise
+    compiles them per call).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    if engine == 'myers' and error_types:
+        raise ValueError("The myers engine does not support per-type error limits")
+    constraints = fuzzy_constraints(max_errors, error_types)
+    flags = regex.BESTMATCH if bestmatch else 0
+    for q in queries:
+        rev_seq = reverse_complement(q['seq'])
+        q['rev_seq'] = rev_seq
+        if engine == 'regex':
+            expanded_fwd = expand_ambiguous(q['seq'])
+            q['fwd_re'] = regex.compile(f"({expanded_fwd}){{{constraints}}}", flags)
+            if rev_seq != q['seq']:
+                expanded_rev = expand_ambiguous(rev_seq)
+                q['rev_re'] = regex.compile(f"({expanded_rev}){{{constraints}}}", flags)
+            else:
+                q['rev_re'] = None
+            if screens:
+                q['fwd_screen'] = _compile_screen(q['seq'], max_errors)
+                q['rev_screen'] = _compile_screen(rev_seq, max_errors) if q['rev_re'] else None
+        else:
+            q['fwd_myers'] = compile_myers(q['seq'])
+            q['rev_myers'] = compile_myers(rev_seq) if rev_seq != q['seq'] else None
+    return queries
+
+def anchor_spans(read_len, search_5p=None, search_3p=None):
+    """
+    Read slices covering the first search_5p and last search_3p bases
+    (either may be None), merged if they touch; the whole read if neither
+    is set.
+    """
+    if search_5p is None and search_3p is None:
+        return [(0, read_len)]
+    spans = []
+    if search_5p is not None:
+        spans.append((0, min(search_5p, read_len)))
+    if search_3p is not None:
+        lo = max(0, read_len - search_3p)
+        if spans and lo <= spans[0][1]:
+            spans[0] = (0, read_len)
+        else:
+            spans.append((lo, read_len))
+    return spans
+
+def anchored_windows(queries, read_len, search_5p=None, search_3p=None):
+    """
+    Restricts the search to the read ends: the first search_5p and/or last
+    search_3p bases. Per-query 'search_5p'/'search_3p' values override the
+    global ones. Returns windows in the find_matches format, or None if no
+    query is anchored.
+    """
+    windows = {}
+    anchored = False
+    for query_idx, q in enumerate(queries):
+        n5 = q.get('search_5p')
+        n3 = q.get('search_3p')
+        if n5 is None and n3 is None:
+            n5, n3 = search_5p, search_3p
+        if n5 is not None or n3 is not None:
+            anchored = True
+        spans = anchor_spans(read_len, n5, n3)
+        windows[(query_idx, 1)] = spans
+        windows[(query_idx, -1)] = spans
+    return windows if anchored else None
+
+def intersect_windows(a, b):
+    """
+    Intersects two window dicts (as taken by find_matches). None means the
+    whole read, so the other dict is returned unchanged.
+    """
+    if a is None:
+        return b
+    if b is None:
+        return a
+    out = {}
+    for key, spans_a in a.items():
+        spans_b = b.get(key)
+        if not spans_b:
+            continue
+        spans = []
+        for lo_a, hi_a in spans_a:
+            for lo_b, hi_b in spans_b:
+                lo, hi = max(lo_a, lo_b), min(hi_a, hi_b)
+                if lo < hi:
+                    spans.append((lo, hi))
+        if spans:
+            out[key] = sorted(spans)
+    return out
+
+def split_read_windows(read_len, window, overlap):
+    """
+    Splits a long read into windows of window + overlap bases starting every
+    window bases. With overlap at least the longest possible match (query
+    length + errors), every match lies whole in the window whose core
+    [start, start + core) holds its start.
+    Returns [(start, end, core), ...]; short reads are one window.
+    """
+    if read_len <= window + overlap:
+        return [(0, read_len, read_len)]
+    starts = range(0, read_len - overlap, window)
+    pieces = [(start, start + window + overlap, window) for start in starts[:-1]]
+    last = starts[-1]
+    pieces.append((last, read_len, read_len - last))
+    return pieces
+
+def merge_window_hits(window_hits):
+    """
+    Joins the hits of consecutive windows of one read (already in read
+    coordinates, each window keeping only hits starting in its core) and
+    drops hits overlapping a hit of the same query and strand from the
+    previous window, which happens when a window cuts into a match at its
+    seam. Returns the read's hits sorted by start.
+    """
+    merged = []
+    previous = []
+    for hits in window_hits:
+        kept = [h for h in hits
+                if not any(p['name'] == h['name'] and p['strand'] == h['strand']
+                           and p['start'] < h['end'] and h['start'] < p['end'] for p in previous)]
+        merged.extend(kept)
+        previous = kept
+    merged.sort(key=lambda x: x['start'])
+    return merged
+
+# Drawn between the mates of a pair in reports
+PAIR_GAP = "-" * 10
+
+def mate_names(query_names):
+    """Pair-level query names: every query once per mate."""
+    return [f"{name}/R{mate}" for mate in (1, 2) for name in query_names]
+
+def pair_view(seq1, seq2, hits1, hits2):
+    """
+    Joins a read pair into one (seq, hits) for reports and clustering:
+    R2 follows R1 after PAIR_GAP and hit names carry the mate (see
+    mate_names), so signatures are pair-level.
     """
-    Uses regex fuzzy matching to find adapters.
+    shift = len(seq1) + len(PAIR_GAP)
+    hits = [dict(h, name=f"{h['name']}/R1") for h in hits1]
+    hits.extend(dict(h, name=f"{h['name']}/R2", start=h['start'] + shift, end=h['end'] + shift) for h in hits2)
+    return seq1 + PAIR_GAP + seq2, hits
+
+def _scan_spans(windows, query_idx, strand, read_len):
+    """
+    Read slices to scan for one query strand: the whole read, or only the
+    candidate windows handed over by the seed prefilter.
+    """
+    if windows is None:
+        return ((0, read_len),)
+    return windows.get((query_idx, strand), ())
+
+def _scanned_queries(queries, windows):
+    """
+    (query_idx, query) pairs worth scanning: all queries, or only those with
+    candidate windows, so large query sets cost nothing for absent queries.
+    """
+    if windows is None:
+        return enumerate(queries)
+    return ((query_idx, queries[query_idx]) for query_idx in sorted({key[0] for key in windows}))
+
+def _find_matches_myers(read_seq, queries, max_errors, windows=None):
+    """
+    Bit-parallel counterpart of find_matches, returning hit dicts of the
+    same form; see _myers_end for where the ends can differ.
+    """
+    hits = []
+    text = read_seq.encode('ascii', 'replace')
+    for query_idx, q in _scanned_queries(queries, windows):
+        fwd = q.get('fwd_myers')
+        if fwd is None:
+            fwd = compile_myers(q['seq'])
+        rev_seq = q.get('rev_seq') or reverse_complement(q['seq'])
+        if 'rev_myers' in q:
+            rev = q['rev_myers']
+        else:
+            rev = compile_myers(rev_seq) if rev_seq != q['seq'] else None
+
+        for strand, pattern in ((1, fwd), (-1, rev)):
+            if pattern is None:
+                continue
+            for lo, hi in _scan_spans(windows, query_idx, strand, len(read_seq)):
+                for start, end, errors in myers_finditer(pattern, text, max_errors, lo, hi):
+                    hits.append({
+                        'name': q['name'],
+                        'start': start,
+                        'end': end,
+                        'len': end - start,
+                        'errors': errors,
+                        'match_seq': read_seq[start:end],
+                        'strand': strand
+                    })
+
+    hits.sort(key=lambda x: x['start'])
+    return hits
+
+def find_matches(read_seq, queries, max_errors, engine='regex', windows=None):
+    """
+    Uses regex fuzzy matching (or the Myers bit-vector engine) to find adapters.
+    If windows is given ({(query_idx, strand): [(lo, hi), ...]}, see
+    prefilter.find_candidates), only those slices of the read are scanned.
     Returns list of hits.
     """
+    if engine == 'myers':
+        return _find_matches_myers(read_seq, queries, max_errors, windows)
+
     hits = []
-    for q in queries:
+    for query_idx, q in _scanned_queries(queries, windows):
         # Forward strand
         fwd_re = q.get('fwd_re')
         if fwd_re is None:
@@ -78,19 +576,20 @@ def find_matches(read_seq, queries, max_errors):
             fwd_pattern = f"({expanded_seq}){{e<={max_errors}}}"
             fwd_re = regex.compile(fwd_pattern, regex.BESTMATCH)
 
-        matches = fwd_re.finditer(read_seq)
-        for m in matches:
-            start, end = m.span()
-            errors = sum(m.fuzzy_counts)
-            hits.append({
-                'name': q['name'],
-                'start': start,
-                'end': end,
-                'len': end - start,
-                'errors': errors,
-                'match_seq': m.group(),
-                'strand': 1
-            })
+        for lo, hi in _scan_spans(windows, query_idx, 1, len(read_seq)):
+            matches = fwd_re.finditer(read_seq, lo, hi)
+            for m in matches:
+                start, end = m.span()
+                errors = sum(m.fuzzy_counts)
+                hits.append({
+                    'name': q['name'],
+                    'start': start,
+                    'end': end,
+                    'len': end - start,
+                    'errors': errors,
+                    'match_seq': m.group(),
+                    'strand': 1
+                })
 
         # Reverse strand
         rev_re = q.get('rev_re')
@@ -104,20 +603,96 @@ def find_matches(read_seq, queries, max_errors):
             rev_re = regex.compile(rev_pattern, regex.BESTMATCH)
 
         if rev_re:
-            matches = rev_re.finditer(read_seq)
-            for m in matches:
-                start, end = m.span()
-                errors = sum(m.fuzzy_counts)
-                hits.append({
-                    'name': q['name'],
-                    'start': start,
-                    'end': end,
-                    'len': end - start,
-                    'errors': errors,
-                    'match_seq': m.group(),
-                    'strand': -1
-                })
+            for lo, hi in _scan_spans(windows, query_idx, -1, len(read_seq)):
+                matches = rev_re.finditer(read_seq, lo, hi)
+                for m in matches:
+                    start, end = m.span()
+                    errors = sum(m.fuzzy_counts)
+                    hits.append({
+                        'name': q['name'],
+                        'start': start,
+                        'end': end,
+                        'len': end - start,
+                        'errors': errors,
+                        'match_seq': m.group(),
+                        'strand': -1
+                    })
 
     # Sort hits by start position
     hits.sort(key=lambda x: x['start'])
     return hits
+
+def find_matches_batch(read_seqs, queries, max_errors):
+    """
+    Batch counterpart of find_matches for the regex engine: returns a list
+    with find_matches(seq, queries, max_errors) for every read.
+
+    The reads are joined with BATCH_SEPARATOR and each query strand's screen
+    pattern runs over the whole buffer, so reads without a match cost no
+    per-read Python calls. Match offsets are mapped back to reads by
+    bisecting the read start offsets, and the search jumps to the next read
+    after each match. Screened reads are then matched with the BESTMATCH
+    patterns, restricted to the query strands that were found, so hits are
+    exactly those of find_matches.
+    """
+    offsets = []
+    pos = 0
+    for seq in read_seqs:
+        offsets.append(pos)
+        pos += len(seq) + 1
+    buffer = BATCH_SEPARATOR.join(read_seqs)
+
+    found = {}
+    for query_idx, q in enumerate(queries):
+        screens = q.get('fwd_screen'), q.get('rev_screen')
+        if 'fwd_screen' not in q:
+            rev_seq = q.get('rev_seq') or reverse_complement(q['seq'])
+            screens = (_compile_screen(q['seq'], max_errors),
+                       _compile_screen(rev_seq, max_errors) if rev_seq != q['seq'] else None)
+        for strand, screen in zip((1, -1), screens):
+            if screen is None:
+                continue
+            pos = 0
+            while True:
+                m = screen.search(buffer, pos)
+                if m is None:
+                    break
+                read_idx = bisect.bisect_right(offsets, m.start()) - 1
+                windows = found.setdefault(read_idx, {})
+                windows[(query_idx, strand)] = [(0, len(read_seqs[read_idx]))]
+                if read_idx + 1 == len(offsets):
+                    break
+                pos = offsets[read_idx + 1]
+
+    results = []
+    for read_idx, seq in enumerate(read_seqs):
+        windows = found.get(read_idx)
+        results.append(find_matches(seq, queries, max_errors, 'regex', windows) if windows else [])
+    return results
+
+def find_presence(read_seq, queries, max_errors, engine='regex', windows=None):
+    """
+    Presence-only matching: stops at the first acceptable match per query
+    and strand instead of enumerating hits.
+    Returns a bitmask with bit 2*i set if query i is found on the forward
+    strand and bit 2*i+1 if found on the reverse strand.
+    """
+    mask = 0
+    text = read_seq.encode('ascii', 'replace') if engine == 'myers' else None
+    for query_idx, q in _scanned_queries(queries, windows):
+        if engine == 'myers':
+            patterns = ((1, q['fwd_myers']), (-1, q['rev_myers']))
+        else:
+            patterns = ((1, q['fwd_re']), (-1, q['rev_re']))
+        for strand, pattern in patterns:
+            if pattern is None:
+                continue
+            for lo, hi in _scan_spans(windows, query_idx, strand, len(read_seq)):
+                if engine == 'myers':
+                    found = myers_search(pattern, text, max_errors, lo, hi)
+                else:
+                    found = pattern.search(read_seq, lo, hi) is not None
+                if found:
+                    mask |= 1 << (2 * query_idx + (strand == -1))
+                    break
+    return mask
@@ -288,9 +288,11 @@ def generate_html(data, output_path, query_names=None):
     with open(output_path, 'w') as f:
         f.write(html_content)
 
-def generate_cluster_html(clusters, output_path, query_names=None):
+def generate_cluster_html(clusters, output_path, query_names=None, counts=None):
     """
     Generates a minimalist clustered visualization.
+    If counts ({signature: total reads}) is given, clusters may hold only a
+    sample of each signature's reads; the totals are shown alongside.
     """
     if query_names is None:
         # Discover unique query names from clusters
@@ -329,12 +331,13 @@ def generate_cluster_html(clusters, output_path, query_names=None):
 
         cluster_data.append({
             'signature': sig_name,
+            'count': counts.get(sig, len(reads)) if counts else len(reads),
             'reads': cluster_reads,
             'max_width': max(r['seq_len'] + r['offset'] for r in cluster_reads)
         })
 
     # Sort clusters by abundance (descending)
-    cluster_data.sort(key=lambda x: len(x['reads']), reverse=True)
+    cluster_data.sort(key=lambda x: x['count'], reverse=True)
 
     html_content = f"""<!DOCTYPE html>
 <html lang="en">
@@ -505,7 +508,7 @@ def generate_cluster_html(clusters, output_path, query_names=None):
             tdSig.appendChild(a);
 
             const tdCount = document.createElement('td');
-            tdCount.textContent = cluster.reads.length;
+            tdCount.textContent = cluster.count;
 
             tr.appendChild(tdSig);
             tr.appendChild(tdCount);
@@ -517,8 +520,9 @@ def generate_cluster_html(clusters, output_path, query_names=None):
 
             const title = document.createElement('div');
             title.className = 'cluster-title';
-            const count = cluster.reads.length;
-            title.textContent = cluster.signature + ' (' + count + ' read' + (count !== 1 ? 's' : '') + ')';
+            const count = cluster.count;
+            title.textContent = cluster.signature + ' (' + count + ' read' + (count !== 1 ? 's' : '') +
+                (cluster.reads.length < count ? ', showing a sample of ' + cluster.reads.length : '') + ')';
             clusterDiv.appendChild(title);
 
             const vizArea = document.createElement('div');
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import pickle
+from .processing import reverse_complement
+from .hamming import _best_first
+
+WHITELIST_INDEX_VERSION = 2
+_BASES = set('ACGT')
+
+def _part_bounds(length, max_errors):
+    """
+    Splits a barcode length into max_errors + 1 near-equal parts. By the
+    pigeonhole principle a window within max_errors mismatches of a barcode
+    matches at least one of its parts exactly.
+    """
+    n_parts = max_errors + 1
+    return [(length * p // n_parts, length * (p + 1) // n_parts) for p in range(n_parts)]
+
+def whitelist_fingerprint(queries, max_errors):
+    """Hash of the query set and error budget an index was built for."""
+    h = hashlib.sha1(f"v{WHITELIST_INDEX_VERSION}:{max_errors}".encode())
+    for q in queries:
+        h.update(f"\n{q['name']}\t{q['seq']}".encode())
+    return h.hexdigest()
+
+def build_whitelist_index(queries, max_errors):
+    """
+    Builds a pigeonhole hash index over a barcode whitelist on both
+    strands: each barcode strand is split into max_errors + 1 parts (see
+    _part_bounds) and every part is indexed, so memory grows linearly with
+    the whitelist. Matching counts substitutions only (Hamming distance);
+    a read window is looked up part by part and the barcodes sharing a
+    part are verified. Returns a dict:
+        'tables': {length: [{part_seq: code or [code, ...]}, ...]} with one
+                  table per part and code = 2 * query_idx + (1 for the
+                  reverse strand),
+        'targets': the barcode strand sequence of every code (None for the
+                   reverse strand of a palindrome),
+        'names', 'seqs': the whitelist, 'max_errors': k,
+        'fingerprint': see whitelist_fingerprint
+    """
+    tables = {}
+    targets = []
+    for query_idx, q in enumerate(queries):
+        seq = q['seq']
+        if not seq or not set(seq) <= _BASES:
+            raise ValueError(f"Whitelist query '{q['name']}' must be a non-empty A/C/G/T sequence")
+        rev_seq = reverse_complement(seq)
+        if rev_seq == seq:
+            rev_seq = None
+        targets.extend((seq, rev_seq))
+        part_tables = tables.get(len(seq))
+        if part_tables is None:
+            part_tables = tables[len(seq)] = [{} for _ in range(max_errors + 1)]
+        for rev, strand_seq in enumerate((seq, rev_seq)):
+            if strand_seq is None:
+                continue
+            code = 2 * query_idx + rev
+            for table, (lo, hi) in zip(part_tables, _part_bounds(len(seq), max_errors)):
+                key = strand_seq[lo:hi]
+                entry = table.get(key)
+                # Most parts belong to a single barcode; keep those as a bare int
+                if entry is None:
+                    table[key] = code
+                elif isinstance(entry, int):
+                    table[key] = [entry, code]
+                else:
+                    entry.append(code)
+    return {'version': WHITELIST_INDEX_VERSION,
+            'max_errors': max_errors,
+            'names': [q['name'] for q in queries],
+            'seqs': [q['seq'] for q in queries],
+            'targets': targets,
+            'tables': tables,
+            'fingerprint': whitelist_fingerprint(queries, max_errors)}
+
+def save_whitelist_index(index, path):
+    with open(path, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _read_index(path):
+    with open(path, 'rb') as f:
+        index = pickle.load(f)
+    if not isinstance(index, dict) or 'version' not in index:
+        raise ValueError(f"{path} is not a softmatch whitelist index")
+    return index
+
+def load_whitelist_index(path):
+    """
+    Loads an index written by save_whitelist_index. Index files are
+    pickles, so only load ones you created.
+    """
+    index = _read_index(path)
+    if index['version'] != WHITELIST_INDEX_VERSION:
+        raise ValueError(f"{path} is a version {index['version']} whitelist index, "
+                         f"expected version {WHITELIST_INDEX_VERSION}")
+    return index
+
+def load_or_build_whitelist_index(queries, max_errors, path=None):
+    """
+    Returns (index, reused): the index stored at path if it was built for
+    the same queries and max_errors by this index version, otherwise a
+    freshly built one (saved to path when given).
+    """
+    if path is not None and os.path.exists(path):
+        index = _read_index(path)
+        # The fingerprint covers the index version, so older indexes are rebuilt
+        if index.get('fingerprint') == whitelist_fingerprint(queries, max_errors):
+            return index, True
+    index = build_whitelist_index(queries, max_errors)
+    if path is not None:
+        save_whitelist_index(index, path)
+    return index, False
+
+def find_whitelist_matches(read_seq, index, spans=None):
+    """
+    Looks up every window of the read in the whitelist index. spans
+    ([(lo, hi), ...], see anchor_spans) limits the read slices windows must
+    lie in. Hits of each barcode strand are picked within each span like
+    regex BESTMATCH (see hamming._best_first), so results equal those of
+    --engine hamming and --mismatches-only.
+    Returns hit dicts like find_matches.
+    """
+    k = index['max_errors']
+    names = index['names']
+    targets = index['targets']
+    n = len(read_seq)
+    if spans is None:
+        spans = ((0, n),)
+
+    kept = {} # code -> [(start, end, errors), ...]
+    for length, part_tables in index['tables'].items():
+        parts = list(zip(part_tables, _part_bounds(length, k)))
+        for lo, hi in spans:
+            candidates = {} # code -> [(start, errors), ...]
+            for start in range(lo, hi - length + 1):
+                window = read_seq[start:start + length]
+                found = set()
+                for table, (part_lo, part_hi) in parts:
+                    entry = table.get(window[part_lo:part_hi])
+                    if entry is None:
+                        continue
+                    if isinstance(entry, int):
+                        found.add(entry)
+                    else:
+                        found.update(entry)
+                for code in found:
+                    errors = sum(map(str.__ne__, window, targets[code]))
+                    if errors <= k:
+                        candidates.setdefault(code, []).append((start, errors))
+            for code, code_candidates in candidates.items():
+                kept.setdefault(code, []).extend(
+                    (start, start + length, errors) for start, errors in _best_first(code_candidates, length, lo, hi))
+
+    hits = []
+    for code in sorted(kept):
+        for start, end, errors in kept[code]:
+            hits.append({
+                'name': names[code >> 1],
+                'start': start,
+                'end': end,
+                'len': end - start,
+                'errors': errors,
+                'match_seq': read_seq[start:end],
+                'strand': -1 if code & 1 else 1
+            })
+    hits.sort(key=lambda x: x['start'])
+    return hits
@@ -0,0 +1,62 @@
+import io
+import os
+import tempfile
+import unittest
+from softmatch.checkpoint import checkpoint_path, run_fingerprint, save_checkpoint, load_checkpoint, truncate_output
+from softmatch.pipeline import BackgroundWriter
+from softmatch.processing import parse_fastq_range
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.queries = os.path.join(self.test_dir.name, "q.csv")
+        self.fastq = os.path.join(self.test_dir.name, "r.fastq")
+        with open(self.queries, 'w') as f:
+            f.write("name,sequence\nAdapter1,ATCGGA\n")
+        with open(self.fastq, 'w') as f:
+            f.write("@r1\nACGT\n+\nIIII\n@r2\nGG\n+\nII\n@r3\nT\n+\nI\n")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_round_trip_and_fingerprint(self):
+        path = checkpoint_path(os.path.join(self.test_dir.name, "res.txt"))
+        fingerprint = run_fingerprint({'errors': 1}, self.queries, [self.fastq])
+        self.assertIsNone(load_checkpoint(path, fingerprint))
+        save_checkpoint(path, {'fingerprint': fingerprint, 'batches': 3, 'position': (0, 300, None)})
+        state = load_checkpoint(path, fingerprint)
+        self.assertEqual((state['batches'], state['position']), (3, (0, 300, None)))
+        # Other options, queries or inputs make it a different run
+        self.assertNotEqual(run_fingerprint({'errors': 2}, self.queries, [self.fastq]), fingerprint)
+        with open(self.fastq, 'a') as f:
+            f.write("@r4\nA\n+\nI\n")
+        with self.assertRaises(ValueError):
+            load_checkpoint(path, run_fingerprint({'errors': 1}, self.queries, [self.fastq]))
+
+    def test_truncate_output(self):
+        path = os.path.join(self.test_dir.name, "res.txt")
+        with open(path, 'wb') as f:
+            f.write(b"header\nrow1\npartial")
+        truncate_output(path, 12)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b"header\nrow1\n")
+        with self.assertRaises(ValueError):
+            truncate_output(path, 100)
+
+    def test_range_offsets_resume_parsing(self):
+        records = list(parse_fastq_range(self.fastq, 0, os.path.getsize(self.fastq), with_offsets=True))
+        self.assertEqual([r[0] for r in records], ["@r1", "@r2", "@r3"])
+        self.assertEqual(records[-1][3], os.path.getsize(self.fastq))
+        rest = list(parse_fastq_range(self.fastq, records[0][3], os.path.getsize(self.fastq)))
+        self.assertEqual(rest, [r[:3] for r in records[1:]])
+
+    def test_writer_flush_barrier(self):
+        out = io.BytesIO()
+        with BackgroundWriter(out, max_queued=2) as writer:
+            for i in range(50):
+                writer.write(f"{i}\n".encode())
+            writer.flush()
+            self.assertEqual(out.getvalue(), "".join(f"{i}\n" for i in range(50)).encode())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import io
+import os
+import random
+import tempfile
+import unittest
+from softmatch import cli
+from softmatch.pipeline import BackgroundWriter
+from softmatch.processing import PAIR_GAP
+
+class TestWorker(unittest.TestCase):
+    def test_worker_uses_initializer_state(self):
+        cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCG'}], 0))
+        batch = [("@r1 desc", "NNNNATCGNNNNCGATNNNN", "I" * 20), ("@r2", "GGGG", "IIII")]
+        block, reports, stats = cli._process_read_batch((batch, 2))
+        self.assertEqual(block, b"@r1\tAdapter1\t4\t8\t+\t0\tATCG\n@r1\tAdapter1\t12\t16\t-\t0\tCGAT\n")
+        self.assertEqual([(read_id, len(hits)) for read_id, _, hits in reports], [("@r1", 2), ("@r2", 0)])
+        self.assertEqual((stats['reads'], stats['reads_with_hits'], stats['prefilter_rejected']), (2, 1, 0))
+
+    def test_worker_settings_by_name(self):
+        settings = cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCG'}], 1, mode='presence')
+        self.assertEqual((settings['max_errors'], settings['mode'], settings['engine']),
+                         (1, 'presence', cli.DEFAULT_ENGINE))
+        with self.assertRaises(TypeError):
+            cli._worker_settings([], 0, out_format='columnar')
+
+    def test_reports_limited_to_keep(self):
+        cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCG'}], 0))
+        batch = [(f"@r{i}", "GGGG", "IIII") for i in range(5)]
+        _, reports, _ = cli._process_read_batch((batch, 3))
+        self.assertEqual([read_id for read_id, _, _ in reports], ["@r0", "@r1", "@r2"])
+
+    def test_sequence_cache(self):
+        cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCG'}], 0, cache_size=1))
+        batch = [("@r1", "AATCGA", "I" * 6), ("@r2", "AATCGA", "I" * 6),
+                 ("@r3", "GGGG", "IIII"), ("@r4", "AATCGA", "I" * 6)]
+        _, reports, stats = cli._process_read_batch((batch, 4))
+        self.assertEqual([len(hits) for _, _, hits in reports], [1, 1, 0, 1])
+        # r2 hits the cache, r4 misses because r3 evicted it (size 1)
+        self.assertEqual((stats['cache_lookups'], stats['cache_hits']), (4, 1))
+
+    def test_batch_regex_matches_per_read(self):
+        batch = [(f"@r{i}", seq, "I" * len(seq)) for i, seq in
+                 enumerate(["NNATCGGANN", "TCCGATNN", "GGGG", "NNATCGGANN", "ATCG"])]
+        expected = None
+        for batch_regex in (False, True):
+            cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCGGA'}], 1, cache_size=0,
+                                                  batch_regex=batch_regex))
+            block, reports, _ = cli._process_read_batch((batch, 5))
+            if expected is None:
+                expected = (block, list(reports))
+            self.assertEqual((block, list(reports)), expected)
+
+    def test_collapsed_batch_keeps_read_order(self):
+        cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCG'}], 0, cache_size=0))
+        batch = [("@r1", "AATCGA", "I" * 6), ("@r2", "GGGG", "IIII"), ("@r3", "AATCGA", "I" * 6)]
+        task = cli._collapse_batch(batch, keep=3)
+        self.assertEqual(task[1], ["AATCGA", "GGGG"])
+        block, reports, stats = cli._process_collapsed_batch(task)
+        expected_block, expected_reports, _ = cli._process_read_batch((batch, 3))
+        self.assertEqual((block, list(reports)), (expected_block, list(expected_reports)))
+        self.assertEqual((stats['reads'], stats['collapsed']), (3, 1))
+
+    def test_presence_batch(self):
+        cli._init_worker(cli._worker_settings([{'name': 'A1', 'seq': 'ACGTT'}, {'name': 'A2', 'seq': 'GGGCC'}], 0,
+                                              mode='presence'))
+        batch = [("@r1 desc", "TTACGTTAA", "I" * 9), ("@r2", "TTTTTTT", "I" * 7), ("@r3", "TACGTTGGCCC", "I" * 11)]
+        block, _, stats = cli._process_read_batch((batch, 0))
+        self.assertEqual(block, b"@r1\t+\t.\n@r3\t+\t-\n")
+        self.assertEqual(stats['signatures'], {0b0001: 1, 0b1001: 1})
+        self.assertEqual(cli._signature_label(0b1001, ['A1', 'A2']), "A1(+) + A2(-)")
+
+    def test_demux_blocks_per_signature(self):
+        cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCGGA'}], 0, demux=True,
+                                              trim=True))
+        batch = [("@r1 x", "ATCGGACCCC", "ABCDEFGHIJ"), ("@r2", "GGGG", "IIII"), ("@r3", "TTTTCCGA", "abcdefgh")]
+        block, _, stats = cli._process_read_batch((batch, 0))
+        self.assertEqual(block.count(b"\n"), 1)
+        self.assertEqual(stats['demux'], {"Adapter1+": b"@r1 x\nCCCC\n+\nGHIJ\n",
+                                          "unmatched": b"@r2\nGGGG\n+\nIIII\n@r3\nTTTTCCGA\n+\nabcdefgh\n"})
+
+class TestPairedEnd(unittest.TestCase):
+    def test_pair_batch_rows_and_reports(self):
+        cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCGGA'}], 0))
+        pairs = [("@p1/1", "NNATCGGANN", "GGGG"), ("@p2/1", "GGGG", "TCCGATNN"), ("@p3/1", "GGGG", "CCCC")]
+        block, reports, stats = cli._process_pair_batch((pairs, 3))
+        self.assertEqual(block, b"@p1\t1\tAdapter1\t2\t8\t+\t0\tATCGGA\n@p2\t2\tAdapter1\t0\t6\t-\t0\tTCCGAT\n")
+        self.assertEqual((stats['reads'], stats['reads_with_hits']), (3, 2))
+        # Reports show each pair as R1 + gap + R2 with mate-tagged hit names
+        _, seq, hits = list(reports)[1]
+        self.assertEqual(seq, "GGGG" + PAIR_GAP + "TCCGATNN")
+        self.assertEqual([(h['name'], h['start']) for h in hits], [("Adapter1/R2", 4 + len(PAIR_GAP))])
+
+    def test_pair_presence_masks(self):
+        cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCGGA'}], 0,
+                                              mode='presence'))
+        block, _, stats = cli._process_pair_batch(([("@p1", "NNATCGGANN", "TCCGATNN")], 0))
+        self.assertEqual(block, b"@p1\t+\t-\n")
+        self.assertEqual(stats['signatures'], {0b1001: 1})
+
+class TestLongReads(unittest.TestCase):
+    def test_windows_reassemble_across_batches(self):
+        rng = random.Random(7)
+        adapter = "GATTACAGGCT"
+        reads = []
+        for i in range(3):
+            seq = list(''.join(rng.choice('ACGT') for _ in range(400)))
+            # Plant adapters on and around the window seams
+            for pos in (0, 45, 55, 95, 150, 389):
+                seq[pos:pos + len(adapter)] = adapter
+            reads.append((f"@long{i}", ''.join(seq), "I" * 400))
+        cli._init_worker(cli._worker_settings([{'name': 'A1', 'seq': adapter}], 0, cache_size=0))
+        expected = b"".join(cli._process_read_batch(([read], 3))[0] for read in reads)
+
+        read_seqs = {}
+        batches = list(cli._window_batches(iter(reads), 50, len(adapter), 70, read_seqs, lambda read_no: True))
+        self.assertGreater(len(batches), len(reads))
+        # Windows may come back in any order (--unordered)
+        results = [cli._process_windows(batch) for batch in reversed(batches)]
+        blocks, reports = [], []
+        for block, batch_reports, stats in cli._assemble_windows(iter(results), ['A1'], False, 0, read_seqs, 3):
+            blocks.append(block)
+            reports.extend(batch_reports)
+        self.assertEqual(sorted(b"".join(blocks).splitlines()), sorted(expected.splitlines()))
+        self.assertEqual(sorted(read_id for read_id, _, _ in reports), ["@long0", "@long1", "@long2"])
+        self.assertEqual(read_seqs, {})
+
+class TestMultipleInputs(unittest.TestCase):
+    def test_expand_inputs(self):
+        with tempfile.TemporaryDirectory() as d:
+            for name in ("b.fastq", "a.fastq", "c.fq"):
+                open(os.path.join(d, name), 'w').close()
+            manifest = os.path.join(d, "inputs.txt")
+            with open(manifest, 'w') as f:
+                f.write("# lane 2\nc.fq\n\n")
+            paths = cli._expand_inputs([os.path.join(d, "*.fastq"), "x.fastq"], manifest)
+            self.assertEqual(paths, [os.path.join(d, "a.fastq"), os.path.join(d, "b.fastq"), "x.fastq",
+                                     os.path.join(d, "c.fq")])
+            with self.assertRaises(ValueError):
+                cli._expand_inputs([os.path.join(d, "*.bam")])
+        with self.assertRaises(ValueError):
+            cli._expand_inputs([])
+
+    def test_per_file_output(self):
+        self.assertEqual(cli._per_file_output("out/res.txt", "data/lane1.fastq.gz"), "out/res.lane1.txt")
+        self.assertEqual(cli._per_file_output("res.tsv", "s2.fq"), "res.s2.tsv")
+
+    def test_file_column_prefixes_every_row(self):
+        cli._init_worker(cli._worker_settings([{'name': 'Adapter1', 'seq': 'ATCGGA'}], 0))
+        batch = [("@r1", "NNATCGGANNATCGGA", ""), ("@r2", "GGGG", ""), ("@r3", "ATCGGA", "")]
+        file_idx, block, _, stats = cli._process_file_batch((3, "lane1.fastq\t", cli._process_read_batch, (batch, 0)))
+        self.assertEqual(file_idx, 3)
+        self.assertEqual(stats['reads'], 3)
+        rows = block.decode().splitlines()
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(row.startswith("lane1.fastq\t@r") for row in rows))
+        _, plain, _, _ = cli._process_file_batch((0, "", cli._process_read_batch, (batch, 0)))
+        self.assertEqual(block.replace(b"lane1.fastq\t", b""), plain)
+
+class TestBackgroundWriter(unittest.TestCase):
+    def test_writes_blocks_in_order(self):
+        out = io.BytesIO()
+        with BackgroundWriter(out, max_queued=2) as writer:
+            for i in range(100):
+                writer.write(f"{i}\n".encode())
+        self.assertEqual(out.getvalue(), "".join(f"{i}\n" for i in range(100)).encode())
+
+    def test_flush_after_every_block(self):
+        class Pipe(io.BytesIO):
+            flushed = []
+
+            def flush(self):
+                self.flushed.append(self.getvalue())
+
+        out = Pipe()
+        with BackgroundWriter(out, flush=True) as writer:
+            writer.write(b"a\n")
+            writer.write(b"b\n")
+        self.assertEqual(out.flushed[:2], [b"a\n", b"a\nb\n"])
+
+if __name__ == "__main__":
+    unittest.main()
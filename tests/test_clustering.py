@@ -0,0 +1,56 @@
+import pickle
+import random
+import unittest
+from softmatch.clustering import cluster_reads, filter_hits, SignatureSummary
+
+def _read(i, names):
+    hits = [{'name': name, 'start': 10 * j, 'end': 10 * j + 5, 'len': 5, 'errors': j, 'match_seq': "AAAAA",
+             'strand': 1} for j, name in enumerate(names)]
+    return {'id': f"r{i}", 'seq': "A" * (40 + i % 3), 'hits': hits}
+
+class TestFilterHits(unittest.TestCase):
+    def test_greedy_non_overlapping_selection(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            hits = []
+            for _ in range(rng.randint(1, 60)):
+                length = rng.randint(3, 12)
+                start = rng.randrange(100)
+                hits.append({'name': 'q', 'start': start, 'end': start + length, 'len': length,
+                             'errors': rng.randint(0, 2), 'strand': 1})
+            # Reference: check every candidate against every picked hit
+            picked = []
+            for h in sorted(hits, key=lambda x: (x['errors'], -x['len'], x['start'])):
+                if all(not (h['start'] < p['end'] and h['end'] > p['start']) for p in picked):
+                    picked.append(h)
+            self.assertEqual(filter_hits(hits), sorted(picked, key=lambda x: x['start']))
+
+class TestSignatureSummary(unittest.TestCase):
+    def setUp(self):
+        self.reads = [_read(i, ['A1'] if i % 3 else ['A1', 'A2']) for i in range(300)]
+
+    def test_matches_cluster_reads_when_everything_fits(self):
+        left, right = SignatureSummary(1000), SignatureSummary(1000)
+        for read in self.reads[:120]:
+            left.add(read)
+        for read in self.reads[120:]:
+            right.add(read)
+        # Summaries travel between processes pickled as HitColumns
+        left.merge(pickle.loads(pickle.dumps(right)))
+        self.assertEqual(pickle.loads(pickle.dumps(left)).clusters(), cluster_reads(self.reads))
+
+    def test_counts_exact_and_samples_bounded(self):
+        merged = SignatureSummary(10)
+        for start in range(0, 300, 50):
+            part = SignatureSummary(10)
+            for read in self.reads[start:start + 50]:
+                part.add(read)
+            merged.merge(part)
+        self.assertEqual(merged.counts, {(('A1', 1),): 200, (('A1', 1), ('A2', 1)): 100})
+        self.assertEqual({sig: len(reads) for sig, reads in merged.clusters().items()},
+                         {(('A1', 1),): 10, (('A1', 1), ('A2', 1)): 10})
+        ids = [r['id'] for r in merged.clusters()[(('A1', 1),)]]
+        self.assertEqual(len(set(ids)), 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import gzip
+import os
+import struct
+import tempfile
+import threading
+import io
+import unittest
+import zlib
+from unittest import mock
+from softmatch.compression import detect_compression
+from softmatch.processing import parse_fastq
+
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+def _write_bgzf(path, data, block_size=1000):
+    """Minimal BGZF writer: one raw-deflate gzip member per block."""
+    with open(path, 'wb') as f:
+        for i in range(0, len(data), block_size):
+            chunk = data[i:i + block_size]
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+            cdata = compressor.compress(chunk) + compressor.flush()
+            bsize = len(cdata) + 25
+            f.write(b'\x1f\x8b\x08\x04' + b'\x00' * 4 + b'\x00\xff' + struct.pack('<H', 6))
+            f.write(b'BC' + struct.pack('<HH', 2, bsize))
+            f.write(cdata + struct.pack('<II', zlib.crc32(chunk), len(chunk)))
+        f.write(BGZF_EOF)
+
+class TestCompressedInput(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.records = [(f"@read{i} x", "ACGT" * (i % 7 + 1), "I" * (4 * (i % 7 + 1))) for i in range(500)]
+        self.text = "".join(f"{h}\n{s}\n+\n{q}\n" for h, s, q in self.records).encode()
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.test_dir.name, name)
+
+    def test_plain(self):
+        path = self._path("r.fastq")
+        with open(path, 'wb') as f:
+            f.write(self.text)
+        self.assertIsNone(detect_compression(path))
+        self.assertEqual(list(parse_fastq(path)), self.records)
+
+    def test_gzip(self):
+        path = self._path("r.fastq.gz")
+        with gzip.open(path, 'wb') as f:
+            f.write(self.text)
+        self.assertEqual(detect_compression(path), 'gzip')
+        self.assertEqual(list(parse_fastq(path)), self.records)
+
+    def test_bgzf(self):
+        path = self._path("r.fastq.bgz")
+        _write_bgzf(path, self.text)
+        self.assertEqual(detect_compression(path), 'bgzf')
+        self.assertEqual(list(parse_fastq(path, threads=3)), self.records)
+        # Single-threaded falls back to the gzip module, which reads BGZF too
+        self.assertEqual(list(parse_fastq(path, threads=1)), self.records)
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), "needs named pipes")
+    def test_named_pipe(self):
+        # A pipe can be read only once: sniffing must not lose its first bytes
+        for data in (self.text, gzip.compress(self.text)):
+            path = self._path("fifo")
+            os.mkfifo(path)
+
+            def feed():
+                with open(path, 'wb') as f:
+                    f.write(data)
+
+            writer = threading.Thread(target=feed)
+            writer.start()
+            try:
+                self.assertEqual(list(parse_fastq(path)), self.records)
+            finally:
+                writer.join()
+                os.remove(path)
+
+    def _parse_stdin(self, data, threads=2):
+        with mock.patch('sys.stdin', io.TextIOWrapper(io.BytesIO(data))):
+            return list(parse_fastq('-', threads))
+
+    def test_stdin(self):
+        self.assertEqual(self._parse_stdin(self.text), self.records)
+        self.assertEqual(self._parse_stdin(gzip.compress(self.text)), self.records)
+        path = self._path("r.fastq.bgz")
+        _write_bgzf(path, self.text)
+        with open(path, 'rb') as f:
+            bgzf = f.read()
+        self.assertEqual(self._parse_stdin(bgzf, threads=3), self.records)
+        self.assertEqual(self._parse_stdin(bgzf, threads=1), self.records)
+        self.assertEqual(self._parse_stdin(b""), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import gzip
+import os
+import tempfile
+import unittest
+from softmatch.demux import DemuxWriter, signature_filename, trim_span, UNMATCHED, MAX_NAME_LEN
+
+def _hit(start, end):
+    return {'start': start, 'end': end}
+
+class TestSignatureFilename(unittest.TestCase):
+    def test_names(self):
+        self.assertEqual(signature_filename(()), UNMATCHED)
+        self.assertEqual(signature_filename((("adapter_1", 1), ("adapter_2", -1))), "adapter_1+__adapter_2-")
+        self.assertRegex(signature_filename((("adapter 2", -1),)), r"^adapter_2-\.[0-9a-f]{12}$")
+        self.assertRegex(signature_filename((("../x", 1),)), r"^\.\._x\+\.[0-9a-f]{12}$")
+
+    def test_sanitised_names_stay_unique(self):
+        self.assertNotEqual(signature_filename((("a b", 1),)), signature_filename((("a_b", 1),)))
+        self.assertNotEqual(signature_filename((("a/b", 1),)), signature_filename((("a b", 1),)))
+        # A query name holding the separator must not pass for two hits
+        self.assertNotEqual(signature_filename((("a+__b", 1),)), signature_filename((("a", 1), ("b", 1))))
+
+    def test_long_names_stay_unique(self):
+        a = signature_filename((("A" * 40, 1),) * 10)
+        b = signature_filename((("A" * 40, 1),) * 11)
+        self.assertLessEqual(len(a), MAX_NAME_LEN)
+        self.assertNotEqual(a, b)
+
+class TestTrimSpan(unittest.TestCase):
+    def test_keeps_longest_uncovered_stretch(self):
+        self.assertEqual(trim_span(100, []), (0, 100))
+        self.assertEqual(trim_span(100, [_hit(10, 30)]), (30, 100))
+        self.assertEqual(trim_span(100, [_hit(70, 90)]), (0, 70))
+        # Insert between two flanking adapters
+        self.assertEqual(trim_span(100, [_hit(5, 25), _hit(80, 95)]), (25, 80))
+        self.assertEqual(trim_span(20, [_hit(0, 20)]), (0, 0))
+
+class TestDemuxWriter(unittest.TestCase):
+    def test_handle_cap_and_gzip_chunks(self):
+        with tempfile.TemporaryDirectory() as d:
+            expected = {}
+            with DemuxWriter(d, max_open=1, compress=True, buffer_size=10) as writer:
+                for i in range(30):
+                    name = f"sig{i % 3}"
+                    block = f"@r{i}\nACGT\n+\nIIII\n".encode()
+                    writer.write({name: block})
+                    expected[name] = expected.get(name, b"") + block
+                    self.assertLessEqual(len(writer._handles), 1)
+            self.assertEqual(writer.files(), [os.path.join(d, f"sig{i}.fastq.gz") for i in range(3)])
+            for name, data in expected.items():
+                with gzip.open(os.path.join(d, name + ".fastq.gz"), 'rb') as f:
+                    self.assertEqual(f.read(), data)
+
+    def test_truncates_files_from_earlier_runs(self):
+        with tempfile.TemporaryDirectory() as d:
+            for block in (b"old\n", b"new\n"):
+                with DemuxWriter(d) as writer:
+                    writer.write({"sig": block})
+            with open(os.path.join(d, "sig.fastq"), 'rb') as f:
+                self.assertEqual(f.read(), b"new\n")
+
+if __name__ == "__main__":
+    unittest.main()
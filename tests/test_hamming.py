@@ -0,0 +1,55 @@
+import random
+import unittest
+from softmatch.processing import MISMATCHES_ONLY, compile_queries, find_matches, find_presence
+from softmatch.prefilter import build_seed_index, find_candidates
+from softmatch import hamming
+
+@unittest.skipIf(hamming.np is None, "NumPy not installed")
+class TestHammingKernel(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(4)
+        self.queries = [{'name': f"q{i}", 'seq': ''.join(rng.choice('ACGTRN') for _ in range(rng.randint(3, 8)))}
+                        for i in range(4)]
+        self.reads = [''.join(rng.choice('ACGTN') for _ in range(rng.randint(0, 40))) for _ in range(60)]
+
+    def test_matches_regex_substitutions_only(self):
+        for max_errors in (0, 1, 2):
+            regex_queries = compile_queries([dict(q) for q in self.queries], max_errors, error_types=MISMATCHES_ONLY)
+            queries = hamming.compile_hamming_queries([dict(q) for q in self.queries])
+            expected = [find_matches(read, regex_queries, max_errors) for read in self.reads]
+            self.assertEqual(hamming.find_hamming_batch(self.reads, queries, max_errors), expected)
+
+    def test_windows_and_presence(self):
+        regex_queries = compile_queries([dict(q) for q in self.queries], 1, error_types=MISMATCHES_ONLY)
+        queries = hamming.compile_hamming_queries([dict(q) for q in self.queries])
+        windows_list = [{(0, 1): [(2, 20)], (1, -1): [(0, 9), (15, 30)]} for _ in self.reads]
+        self.assertEqual(hamming.find_hamming_batch(self.reads, queries, 1, windows_list),
+                         [find_matches(read, regex_queries, 1, windows=windows_list[0]) for read in self.reads])
+        masks = hamming.find_hamming_batch(self.reads, queries, 1, windows_list, presence=True)
+        self.assertEqual(masks, [find_presence(read, regex_queries, 1, windows=windows_list[0])
+                                 for read in self.reads])
+
+    def test_prefilter_windows_keep_results(self):
+        # Two copies of a query, the worse one first: seed windows must not
+        # change which one the best-first selection keeps
+        rng = random.Random(6)
+        seqs = ['ACGCGATCGACGGGCGGCAGT', 'CAGCCGAGCGTATGTAGGCGG']
+        queries = hamming.compile_hamming_queries([{'name': f"q{i}", 'seq': seq} for i, seq in enumerate(seqs)])
+        for max_errors in (1, 2):
+            index = build_seed_index(queries, max_errors)
+            reads = []
+            for _ in range(50):
+                read = list(''.join(rng.choice('ACGT') for _ in range(160)))
+                seq = rng.choice(seqs)
+                worse = list(seq)
+                for i in rng.sample(range(len(worse)), max_errors):
+                    worse[i] = rng.choice('ACGT'.replace(worse[i], ''))
+                read[10:10 + len(seq)] = worse
+                read[100:100 + len(seq)] = seq
+                reads.append(''.join(read))
+            windows_list = [find_candidates(index, read) for read in reads]
+            self.assertEqual(hamming.find_hamming_batch(reads, queries, max_errors, windows_list),
+                             hamming.find_hamming_batch(reads, queries, max_errors))
+
+if __name__ == "__main__":
+    unittest.main()
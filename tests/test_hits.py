@@ -0,0 +1,88 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+from softmatch import hits as hits_module
+from softmatch.hits import HitColumns, HitTable, encode_chunk, hit_table_header, set_chunk_file
+from softmatch.processing import find_matches
+
+QUERIES = [{'name': 'Adapter1', 'seq': 'ATCGGA'}, {'name': 'Adapter2', 'seq': 'TTGACC'}]
+
+class TestHitColumns(unittest.TestCase):
+    def setUp(self):
+        self.reads = [("@r0", "GGATCGGAGGTTGACCGG"), ("@r1", "CCCCCC"), ("@r2", "TCCGATGGTCAACC")]
+
+    def test_round_trip_matches_hit_dicts(self):
+        columns = HitColumns(q['name'] for q in QUERIES)
+        expected = []
+        for read_id, seq in self.reads:
+            hits = find_matches(seq, QUERIES, 1)
+            columns.add(read_id, seq, hits)
+            expected.append((read_id, seq, hits))
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(columns.n_hits(), sum(len(hits) for _, _, hits in expected))
+        self.assertEqual(list(pickle.loads(pickle.dumps(columns))), expected)
+
+    def test_smaller_than_hit_dicts_when_pickled(self):
+        columns = HitColumns(q['name'] for q in QUERIES)
+        rows = []
+        for i in range(100):
+            seq = "ATCGGA" * 50 + "C" * i
+            hits = find_matches(seq, QUERIES, 0)
+            columns.add(f"@r{i}", seq, hits)
+            rows.append((f"@r{i}", seq, hits))
+        self.assertLess(len(pickle.dumps(columns)), 2 * len(pickle.dumps(rows)) / 3)
+
+class TestHitTable(unittest.TestCase):
+    def setUp(self):
+        self.batches = [[("@r0", "GGATCGGAGGTTGACCGG"), ("@r1", "CCCCCC")], [("@r2", "TCCGATGGTCAACC")], [("@r3", "GG")]]
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.test_dir.name, "t.hits")
+        with open(self.path, 'wb') as f:
+            f.write(hit_table_header([q['name'] for q in QUERIES], ["a.fastq", "b.fastq"]))
+            for file_idx, batch in enumerate(self.batches):
+                columns = HitColumns(q['name'] for q in QUERIES)
+                for read_id, seq in batch:
+                    hits = find_matches(seq, QUERIES, 1)
+                    if hits:
+                        columns.add(read_id, '', hits)
+                f.write(set_chunk_file(encode_chunk(columns), file_idx))
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def _expected(self):
+        rows = []
+        for file_idx, batch in enumerate(self.batches):
+            for read_id, seq in batch:
+                for hit in find_matches(seq, QUERIES, 1):
+                    rows.append((file_idx, read_id, hit['name'], hit['start'], hit['end'], hit['strand'], hit['errors']))
+        return rows
+
+    def _rows(self):
+        table = HitTable(self.path)
+        cols = table.columns()
+        ids = table.read_ids()
+        return [(int(cols['file'][i]), ids[cols['read'][i]], table.query_names[cols['query'][i]], int(cols['start'][i]),
+                 int(cols['end'][i]), int(cols['strand'][i]), int(cols['errors'][i])) for i in range(len(table))]
+
+    def test_round_trip(self):
+        self.assertEqual(encode_chunk(HitColumns(["A"])), b"")
+        table = HitTable(self.path)
+        self.assertEqual((table.files, table.n_reads), (["a.fastq", "b.fastq"], 2))
+        self.assertEqual([chunk['file'] for chunk in table.chunks()], [0, 1])
+        self.assertEqual(self._rows(), self._expected())
+
+    def test_round_trip_without_numpy(self):
+        with mock.patch.object(hits_module, 'np', None):
+            self.assertEqual(self._rows(), self._expected())
+
+    def test_rejects_other_files(self):
+        with open(self.path, 'wb') as f:
+            f.write(b"ReadID\tAdapter\n")
+        with self.assertRaises(ValueError):
+            HitTable(self.path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from softmatch import cli
+from softmatch.index import IndexWriter, ResultIndex, index_path
+
+QUERIES = [{'name': 'Adapter1', 'seq': 'ATCGGA'}, {'name': 'Adapter2', 'seq': 'TTGACC'}]
+HEADER = b"File\tReadID\tAdapter\tStart\tEnd\tStrand\tErrors\tMatchedSequence\n"
+
+class TestResultIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.tsv = os.path.join(self.test_dir.name, "res.txt")
+        batches = [[("@r1", "ATCGGATTGACC", ""), ("@r2", "GGGG", "")],
+                   [("@r3", "TCCGATNNATCGGA", ""), ("@r1", "ATCGGA", "")]]
+        cli._init_worker(cli._worker_settings(QUERIES, 0, index=True))
+        index = IndexWriter(index_path(self.tsv), [q['name'] for q in QUERIES])
+        with open(self.tsv, 'wb') as f:
+            f.write(HEADER)
+            for file_idx, batch in enumerate(batches):
+                _, block, _, stats = cli._process_file_batch((file_idx, f"f{file_idx}\t", cli._process_read_batch,
+                                                              (batch, 0)))
+                index.write((f.tell(),) + stats['index'])
+                f.write(block)
+            size = f.tell()
+        index.close(size)
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_lookup_and_filter(self):
+        with ResultIndex(self.tsv) as index:
+            self.assertEqual(index.header, HEADER.decode())
+            self.assertEqual(index.lookup("@r1"), ["f0\t@r1\tAdapter1\t0\t6\t+\t0\tATCGGA\n",
+                                                   "f0\t@r1\tAdapter2\t6\t12\t+\t0\tTTGACC\n",
+                                                   "f1\t@r1\tAdapter1\t0\t6\t+\t0\tATCGGA\n"])
+            self.assertEqual(index.lookup("@r2"), [])
+            self.assertEqual(list(index.filter("Adapter1", strand=-1)), ["f1\t@r3\tAdapter1\t0\t6\t-\t0\tTCCGAT\n"])
+            self.assertEqual(index.count("Adapter1"), 4)
+            self.assertEqual(len(list(index.filter("Adapter1", limit=2))), 2)
+            with self.assertRaises(ValueError):
+                index.count("Adapter3")
+
+    def test_stale_or_missing_index(self):
+        with open(self.tsv, 'ab') as f:
+            f.write(b"f9\t@r9\tAdapter1\t0\t6\t+\t0\tATCGGA\n")
+        with self.assertRaises(ValueError):
+            ResultIndex(self.tsv)
+        with self.assertRaises(ValueError):
+            ResultIndex(os.path.join(self.test_dir.name, "other.txt"))
+
+    def test_failed_run_leaves_no_index(self):
+        path = os.path.join(self.test_dir.name, "failed.txt.idx")
+        index = IndexWriter(path, ["A"])
+        index.write((0, [("@r1", 0, 1)], [(0, 1, 0, 0)]))
+        index.close()
+        self.assertFalse(os.path.exists(path) or os.path.exists(path + ".tmp"))
+
+class TestLongReadsIndex(unittest.TestCase):
+    def test_long_reads_index_matches_tsv(self):
+        with tempfile.TemporaryDirectory() as d:
+            queries = os.path.join(d, "q.csv")
+            fastq = os.path.join(d, "long.fastq")
+            with open(queries, 'w') as f:
+                f.write("Adapter1,ACGCGATCGACGGGCGGCAGT\nAdapter2,CAGCCGAGCGTATGTAGGCGGACTACGAGCCG\n")
+            with open(fastq, 'w') as f:
+                seq = ("T" * 180 + "ACGCGATCGACGGGCGGCAGT" + "G" * 250 + "CAGCCGAGCGTATGTAGGCGGACTACGAGCCG") * 3
+                for i in range(5):
+                    f.write(f"@long{i}\n{seq}\n+\n{'I' * len(seq)}\n")
+            for mode in ('full', 'presence'):
+                out = os.path.join(d, f"{mode}.txt")
+                argv = ["softmatch", queries, fastq, "-o", out, "--mode", mode, "--long-reads",
+                        "--window-size", "300", "--index", "--no_html"]
+                with mock.patch("sys.argv", argv), mock.patch("sys.stdout"):
+                    cli.main()
+                with open(out) as f:
+                    rows = f.readlines()[1:]
+                with ResultIndex(out) as index:
+                    self.assertEqual(index.lookup("@long3"), [row for row in rows if row.startswith("@long3\t")])
+                    self.assertEqual(list(index.filter("Adapter2")),
+                                     [row for row in rows if mode == 'presence' or "\tAdapter2\t" in row])
+                self.assertTrue(rows)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,9 @@
-from softmatch.processing import reverse_complement, find_matches
+import os
+import tempfile
+from softmatch.processing import (reverse_complement, find_matches, anchored_windows, parse_queries,
+                                  compile_queries, find_presence, find_matches_batch,
+                                  parse_error_types, split_read_windows, merge_window_hits,
+                                  parse_fastq_pairs)
 
 def test_reverse_complement():
     assert reverse_complement("ATCG") == "CGAT"
@@ -18,6 +23,118 @@ def test_find_matches():
     assert hits[1]['start'] == 12
     print("test_find_matches passed")
 
+def test_anchored_windows():
+    queries = [{'name': 'Adapter1', 'seq': 'ATCG'}]
+    read = "ATCGNNNNNNNNNNNNATCGNNNNNNNNNNNNATCG"
+    assert anchored_windows(queries, len(read)) is None
+    windows = anchored_windows(queries, len(read), search_5p=6, search_3p=6)
+    assert windows[(0, 1)] == [(0, 6), (30, 36)]
+    hits = find_matches(read, queries, 0, windows=windows)
+    # Coordinates stay relative to the full read; the middle copy is not scanned
+    assert [(h['start'], h['strand']) for h in hits] == [(0, 1), (32, 1)]
+    # Overlapping ends merge into the whole read
+    assert anchored_windows(queries, 10, search_5p=6, search_3p=6)[(0, 1)] == [(0, 10)]
+    # Per-query windows override the global ones
+    queries.append({'name': 'Adapter2', 'seq': 'GGCC', 'search_5p': None, 'search_3p': 8})
+    windows = anchored_windows(queries, len(read), search_5p=6)
+    assert windows[(0, -1)] == [(0, 6)]
+    assert windows[(1, -1)] == [(28, 36)]
+
+def test_parse_queries_window_columns():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.csv")
+        with open(path, 'w') as f:
+            f.write("a1,acgt\na2,GGCC,40,\na3,TTAA,,25\n")
+        queries = parse_queries(path)
+    assert queries[0] == {'name': 'a1', 'seq': 'ACGT'}
+    assert (queries[1]['search_5p'], queries[1]['search_3p']) == (40, None)
+    assert (queries[2]['search_5p'], queries[2]['search_3p']) == (None, 25)
+
+def test_parse_queries_rejects_bad_windows():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "queries.csv")
+        for row, bad in (("a2,GGCC,40bp,", "40bp"), ("a2,GGCC,,-5", "-5"), ("a2,GGCC, 4 0,", "4 0")):
+            with open(path, 'w') as f:
+                f.write(f"a1,ACGT\n{row}\n")
+            try:
+                parse_queries(path)
+                assert False, "expected ValueError"
+            except ValueError as e:
+                assert "'a2'" in str(e) and f"'{bad}'" in str(e)
+
+def test_find_presence():
+    read = "NNNNATCGNNNNNNNNGGAACCNN"
+    for engine in ('regex', 'myers'):
+        queries = compile_queries([{'name': 'A1', 'seq': 'ATCG'}, {'name': 'A2', 'seq': 'GTTCC'},
+                                   {'name': 'A3', 'seq': 'TTTTT'}], 0, engine, bestmatch=False)
+        # A1 is palindromic (forward only), A2 occurs reverse-complemented, A3 is absent
+        assert find_presence(read, queries, 0, engine) == 0b001001
+        assert find_presence("ATCGGG", queries, 1, engine) & 1
+
+def test_find_matches_batch():
+    queries = [{'name': 'A1', 'seq': 'GATTACAGG'}, {'name': 'A2', 'seq': 'CCTTGAA'}]
+    # Adapters split across neighbouring reads must not be joined into a hit
+    reads = ["TTTTGATTA", "CAGGTTTTT", "GATTACAGGAACCTTGAAT", "", "AAAAAAAA", "TTCAAGGTTCATTACAGG", "CAG"]
+    for compiled, screens in ((False, False), (True, False), (True, True)):
+        for max_errors in (0, 1, 2, 3):
+            qs = compile_queries([dict(q) for q in queries], max_errors, screens=screens) if compiled else queries
+            assert ('fwd_screen' in qs[0]) == screens
+            assert find_matches_batch(reads, qs, max_errors) == [find_matches(r, qs, max_errors) for r in reads]
+
+def test_error_types():
+    assert parse_error_types("s<=2, i<=0,d<=1") == {'s': 2, 'i': 0, 'd': 1}
+    try:
+        parse_error_types("x<=1")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    # One deletion: allowed by edit distance, not with mismatches only
+    read = "GGGATCGAAGGG"
+    queries = compile_queries([{'name': 'A1', 'seq': 'ATCGTAA'}], 1)
+    assert [h['errors'] for h in find_matches(read, queries, 1)] == [1]
+    queries = compile_queries([{'name': 'A1', 'seq': 'ATCGTAA'}], 1, error_types={'i': 0, 'd': 0})
+    assert find_matches(read, queries, 1) == []
+
+def test_split_read_windows():
+    assert split_read_windows(40, 30, 10) == [(0, 40, 40)]
+    assert split_read_windows(100, 30, 10) == [(0, 40, 30), (30, 70, 30), (60, 100, 40)]
+    # Cores tile the read and every window reaches overlap bases past its core
+    for read_len in range(41, 200):
+        pieces = split_read_windows(read_len, 30, 10)
+        assert [start for start, _, _ in pieces] == [sum(core for _, _, core in pieces[:i]) for i in range(len(pieces))]
+        assert sum(core for _, _, core in pieces) == read_len
+        assert all(end == min(read_len, start + core + 10) or end == read_len for start, end, core in pieces)
+
+def test_merge_window_hits():
+    hit = lambda start, end, name='A1': {'name': name, 'start': start, 'end': end, 'strand': 1}
+    merged = merge_window_hits([[hit(5, 15), hit(28, 38)], [hit(30, 38), hit(30, 38, 'A2'), hit(50, 60)]])
+    assert [(h['name'], h['start']) for h in merged] == [('A1', 5), ('A1', 28), ('A2', 30), ('A1', 50)]
+
+def test_parse_fastq_pairs():
+    with tempfile.TemporaryDirectory() as d:
+        paths = [os.path.join(d, f"r{mate}.fastq") for mate in (1, 2)]
+        for mate, path in enumerate(paths, 1):
+            with open(path, 'w') as f:
+                for i in range(3):
+                    f.write(f"@p{i}/{mate} x\n{'ACGT' * mate}\n+\n{'I' * 4 * mate}\n")
+        assert list(parse_fastq_pairs(*paths)) == [(f"@p{i}/1 x", "ACGT", "ACGTACGT") for i in range(3)]
+        with open(paths[1], 'a') as f:
+            f.write("@p3/2\nAC\n+\nII\n")
+        try:
+            list(parse_fastq_pairs(*paths))
+            assert False, "expected ValueError"
+        except ValueError as e:
+            assert "fewer reads" in str(e)
+
 if __name__ == "__main__":
     test_reverse_complement()
     test_find_matches()
+    test_anchored_windows()
+    test_parse_queries_window_columns()
+    test_parse_queries_rejects_bad_windows()
+    test_find_presence()
+    test_find_matches_batch()
+    test_error_types()
+    test_split_read_windows()
+    test_merge_window_hits()
+    test_parse_fastq_pairs()
@@ -0,0 +1,28 @@
+import concurrent.futures
+import unittest
+from softmatch.pipeline import bounded_map
+
+class TestBoundedMap(unittest.TestCase):
+    def test_ordered_and_bounded(self):
+        pulled = []
+
+        def source():
+            for i in range(50):
+                pulled.append(i)
+                yield i
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            out = []
+            for result in bounded_map(executor, lambda x: x * x, source(), max_inflight=3):
+                # The result being handed out plus at most max_inflight pending
+                self.assertLessEqual(len(pulled) - len(out), 4)
+                out.append(result)
+        self.assertEqual(out, [i * i for i in range(50)])
+
+    def test_unordered_yields_everything(self):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            out = list(bounded_map(executor, lambda x: x + 1, range(20), max_inflight=5, ordered=False))
+        self.assertEqual(sorted(out), list(range(1, 21)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import copy
+import random
+import unittest
+from softmatch.processing import compile_queries, find_matches
+from softmatch.prefilter import build_seed_index, find_candidates
+
+QUERIES = [
+    {'name': 'adapter_1', 'seq': 'ACGCGATCGACGGGCGGCAGT'},
+    {'name': 'adapter_2', 'seq': 'CAGCCGAGCGTATGTRGGCGG'},
+]
+
+class TestPrefilter(unittest.TestCase):
+    def test_rejects_reads_without_seeds(self):
+        index = build_seed_index(copy.deepcopy(QUERIES), 2)
+        self.assertEqual(find_candidates(index, "A" * 100), {})
+
+    def test_short_query_always_verified(self):
+        index = build_seed_index([{'name': 'short', 'seq': 'ACGTT'}], 2)
+        self.assertEqual(find_candidates(index, "GGGG"), {(0, 1): [(0, 4)], (0, -1): [(0, 4)]})
+
+    def test_iupac_seeds(self):
+        index = build_seed_index([{'name': 'amb', 'seq': 'ACGTRAAC'}], 0)
+        self.assertIn((0, 1), find_candidates(index, "TTACGTGAACTT"))
+        self.assertIn((0, 1), find_candidates(index, "TTACGTAAACTT"))
+        self.assertNotIn((0, 1), find_candidates(index, "TTACGTCAACTT"))
+
+    def test_windows_keep_all_hits(self):
+        rng = random.Random(3)
+        for max_errors in range(4):
+            queries = compile_queries(copy.deepcopy(QUERIES), max_errors)
+            index = build_seed_index(queries, max_errors)
+            for _ in range(100):
+                read = list(''.join(rng.choice('ACGT') for _ in range(150)))
+                planted = list(rng.choice(QUERIES)['seq'].replace('R', 'A'))
+                for _ in range(rng.randint(0, max_errors)):
+                    planted[rng.randrange(len(planted))] = rng.choice('ACGT')
+                pos = rng.randrange(120)
+                read[pos:pos + len(planted)] = planted
+                read = ''.join(read)
+
+                expected = find_matches(read, queries, max_errors)
+                got = find_matches(read, queries, max_errors, windows=find_candidates(index, read))
+                self.assertEqual(got, expected)
+
+    def test_windows_keep_bestmatch_over_two_copies(self):
+        # A worse copy before a better one: a whole-read BESTMATCH scan only
+        # reports the better one, and so must the prefiltered scan
+        rng = random.Random(4)
+        for max_errors in range(1, 4):
+            queries = compile_queries(copy.deepcopy(QUERIES), max_errors)
+            index = build_seed_index(queries, max_errors)
+            for _ in range(100):
+                read = list(''.join(rng.choice('ACGT') for _ in range(200)))
+                seq = rng.choice(QUERIES)['seq'].replace('R', 'A')
+                worse = list(seq)
+                for i in rng.sample(range(len(worse)), max_errors):
+                    worse[i] = rng.choice('ACGT'.replace(worse[i], ''))
+                pos = rng.randrange(60)
+                read[pos:pos + len(seq)] = worse
+                pos = rng.randrange(90, 175)
+                read[pos:pos + len(seq)] = seq
+                read = ''.join(read)
+
+                expected = find_matches(read, queries, max_errors)
+                got = find_matches(read, queries, max_errors, windows=find_candidates(index, read))
+                self.assertEqual(got, expected)
+
+    def test_automaton_finds_every_seed(self):
+        rng = random.Random(5)
+        queries = [{'name': f"q{i}", 'seq': ''.join(rng.choice('ACGT') for _ in range(rng.randint(8, 30)))}
+                   for i in range(40)]
+        queries.append({'name': 'amb', 'seq': 'ACGTNNACGTRYACGTTT'})
+        for max_errors in range(3):
+            index = build_seed_index(queries, max_errors)
+            for _ in range(50):
+                read = ''.join(rng.choice('ACGTN') for _ in range(100))
+                # Reference: slide each seed length over the read separately
+                expected = {}
+                for seed_len, seeds in index['seeds'].items():
+                    for i in range(len(read) - seed_len + 1):
+                        for query_idx, strand, offset, m in seeds.get(read[i:i + seed_len], ()):
+                            start = i - offset
+                            expected.setdefault((query_idx, strand), set()).add(
+                                (max(0, start - max_errors), min(len(read), start + m + max_errors)))
+                always = {entry[:2] for entry in index['always']}
+                got = {key: spans for key, spans in find_candidates(index, read).items() if key not in always}
+                self.assertEqual(set(got), set(expected))
+                for key, spans in got.items():
+                    # One span from the first to the last seeded window
+                    self.assertEqual(spans, [(min(lo for lo, _ in expected[key]),
+                                              max(hi for _, hi in expected[key]))])
+
+if __name__ == "__main__":
+    unittest.main()
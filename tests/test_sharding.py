@@ -0,0 +1,31 @@
+import os
+import tempfile
+import unittest
+from softmatch.processing import parse_fastq, fastq_shards, parse_fastq_range
+
+class TestSharding(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.test_dir.name, "r.fastq")
+        with open(self.path, 'w') as f:
+            for i in range(300):
+                seq = "ACGT" * (i % 5 + 1)
+                # Quality lines starting with '@' must not be taken as headers
+                f.write(f"@read{i}\n{seq}\n+\n{'@' * len(seq)}\n")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_shards_cover_all_records(self):
+        expected = list(parse_fastq(self.path))
+        for shard_bytes in (1, 37, 500, 10 ** 6):
+            shards = fastq_shards(self.path, shard_bytes)
+            self.assertEqual(shards[0][0], 0)
+            self.assertEqual(shards[-1][1], os.path.getsize(self.path))
+            records = []
+            for start, end in shards:
+                records.extend(parse_fastq_range(self.path, start, end))
+            self.assertEqual(records, expected)
+
+if __name__ == "__main__":
+    unittest.main()
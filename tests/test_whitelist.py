@@ -0,0 +1,113 @@
+import os
+import pickle
+import random
+import tempfile
+import unittest
+from softmatch.processing import MISMATCHES_ONLY, compile_queries, find_matches, reverse_complement
+from softmatch.whitelist import (build_whitelist_index, find_whitelist_matches, load_or_build_whitelist_index)
+
+def _brute_force(read, queries, max_errors):
+    found = set()
+    for query_idx, q in enumerate(queries):
+        for strand, seq in ((1, q['seq']), (-1, reverse_complement(q['seq']))):
+            if strand == -1 and seq == q['seq']:
+                continue
+            for start in range(len(read) - len(seq) + 1):
+                errors = sum(a != b for a, b in zip(read[start:start + len(seq)], seq))
+                if errors <= max_errors:
+                    found.add((q['name'], strand, start, errors))
+    return found
+
+class TestWhitelist(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.queries = [{'name': f"BC{i}", 'seq': ''.join(rng.choice('ACGT') for _ in range(10))}
+                        for i in range(200)]
+        self.reads = []
+        for _ in range(15):
+            read = list(''.join(rng.choice('ACGT') for _ in range(60)))
+            seq = rng.choice(self.queries)['seq']
+            if rng.random() < 0.5:
+                seq = reverse_complement(seq)
+            pos = rng.randrange(50)
+            read[pos:pos + 10] = seq
+            read[pos + rng.randrange(10)] = rng.choice('ACGT')
+            self.reads.append(''.join(read))
+
+    def test_matches_brute_force(self):
+        for max_errors in (0, 1, 2):
+            index = build_whitelist_index(self.queries, max_errors)
+            for read in self.reads:
+                hits = find_whitelist_matches(read, index)
+                got = {(h['name'], h['strand'], h['start'], h['errors']) for h in hits}
+                expected = _brute_force(read, self.queries, max_errors)
+                # Best-first selection keeps a subset of the windows within budget
+                self.assertTrue(got <= expected)
+                self.assertEqual({(n, s) for n, s, _, _ in got}, {(n, s) for n, s, _, _ in expected})
+                self.assertTrue(all(h['match_seq'] == read[h['start']:h['end']] for h in hits))
+
+    def test_matches_mismatches_only_regex(self):
+        # Same best-first selection as --mismatches-only: a worse later hit
+        # overlapping the picked one is dropped
+        queries = [{'name': 'BC', 'seq': 'TCTACA'}]
+        read = "AGCTCAAAATGCGATCAGATATTTGAAAACAAGTAGACC"
+        regex_queries = compile_queries([dict(q) for q in queries], 2, error_types=MISMATCHES_ONLY)
+        self.assertEqual(find_whitelist_matches(read, build_whitelist_index(queries, 2)),
+                         find_matches(read, regex_queries, 2))
+        self.assertEqual(len(find_matches(read, regex_queries, 2)), 2)
+        rng = random.Random(5)
+        queries = self.queries
+        for max_errors in (0, 1, 2):
+            index = build_whitelist_index(queries, max_errors)
+            regex_queries = compile_queries([dict(q) for q in queries], max_errors, error_types=MISMATCHES_ONLY)
+            for read in self.reads:
+                spans = [(0, 25), (40, 60)] if rng.random() < 0.5 else None
+                windows = None if spans is None else {(i, s): spans for i in range(len(queries)) for s in (1, -1)}
+                self.assertEqual(find_whitelist_matches(read, index, spans),
+                                 find_matches(read, regex_queries, max_errors, windows=windows))
+
+    def test_spans_limit_windows(self):
+        index = build_whitelist_index([{'name': 'BC', 'seq': 'ACGTTGCA'}], 0)
+        read = "ACGTTGCA" + "G" * 20 + "ACGTTGCA"
+        self.assertEqual([h['start'] for h in find_whitelist_matches(read, index)], [0, 28])
+        self.assertEqual([h['start'] for h in find_whitelist_matches(read, index, [(0, 10)])], [0])
+
+    def test_index_persisted_and_reused(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "bc.idx")
+            index, reused = load_or_build_whitelist_index(self.queries, 1, path)
+            self.assertFalse(reused)
+            loaded, reused = load_or_build_whitelist_index(self.queries, 1, path)
+            self.assertTrue(reused)
+            self.assertEqual(loaded['tables'], index['tables'])
+            # A different error budget invalidates the stored index
+            self.assertFalse(load_or_build_whitelist_index(self.queries, 2, path)[1])
+
+    def test_index_size_linear(self):
+        # One entry per part of each barcode strand, not one per mismatch pattern
+        for max_errors in (0, 1, 2, 3):
+            index = build_whitelist_index(self.queries, max_errors)
+            entries = sum(1 if isinstance(entry, int) else len(entry)
+                          for part_tables in index['tables'].values()
+                          for table in part_tables for entry in table.values())
+            self.assertEqual(entries, (max_errors + 1) * 2 * len(self.queries))
+
+    def test_older_index_version_rebuilt(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "bc.idx")
+            with open(path, 'wb') as f:
+                pickle.dump({'version': 1, 'fingerprint': 'old', 'tables': {}}, f)
+            index, reused = load_or_build_whitelist_index(self.queries, 1, path)
+            self.assertFalse(reused)
+            self.assertTrue(load_or_build_whitelist_index(self.queries, 1, path)[1])
+            with open(path, 'wb') as f:
+                pickle.dump(['not', 'an', 'index'], f)
+            with self.assertRaises(ValueError):
+                load_or_build_whitelist_index(self.queries, 1, path)
+
+    def test_rejects_ambiguous_bases(self):
+        with self.assertRaises(ValueError):
+            build_whitelist_index([{'name': 'BC', 'seq': 'ACGN'}], 1)
+
+if __name__ == "__main__":
+    unittest.main()